@@ -0,0 +1,88 @@
+"""Encrypted, content-addressed storage for lab attachments."""
+from __future__ import annotations
+
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from .config import paths
+from .crypto import get_crypto_context
+from .crypto_stream import STREAM_CHUNK_SIZE, is_stream
+
+
+class AttachmentStore:
+    """Keep attachment contents as encrypted files outside the database.
+
+    A file lives at ``<root>/<user_id>/<hh>/<content_hash>``, where the hash
+    is a keyed HMAC of the plaintext. Identical files attached to several
+    tasks are therefore stored once, and a file name reveals nothing about
+    its content to anyone without the user's key.
+
+    Contents are written and read as chunked encrypted streams (see
+    :mod:`app.crypto_stream`), so memory use does not grow with file size.
+    """
+
+    def __init__(self, encryption_key: bytes, root: Optional[Path] = None) -> None:
+        self._crypto = get_crypto_context(encryption_key)
+        self.root = root or paths.attachments_dir
+
+    def path(self, user_id: int, content_hash: str) -> Path:
+        return self.root / str(user_id) / content_hash[:2] / content_hash
+
+    def put(self, user_id: int, source: BinaryIO) -> Tuple[str, int]:
+        """Store everything readable from ``source``; returns ``(content_hash, size)``.
+
+        The content is encrypted into a temporary file while it is hashed,
+        then renamed into place, or discarded if an identical file is
+        already stored.
+        """
+        user_dir = self.root / str(user_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        hasher = self._crypto.keyed_hasher("attachment")
+        size = 0
+        fd, temp_name = tempfile.mkstemp(dir=user_dir, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                with self._crypto.stream_writer(handle) as writer:
+                    while True:
+                        block = source.read(STREAM_CHUNK_SIZE)
+                        if not block:
+                            break
+                        hasher.update(block)
+                        writer.write(block)
+                        size += len(block)
+            content_hash = hasher.hexdigest()
+            target = self.path(user_id, content_hash)
+            if target.exists():
+                os.unlink(temp_name)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_name, target)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+            raise
+        return content_hash, size
+
+    def open(self, user_id: int, content_hash: str) -> BinaryIO:
+        """Seekable reader over the plaintext; only the chunks actually read are decrypted."""
+        handle = self.path(user_id, content_hash).open("rb")
+        try:
+            streamed = is_stream(handle.read(4))
+            handle.seek(0)
+            if streamed:
+                return self._crypto.stream_reader(handle)
+            # Files stored before attachments were streamed hold a single payload envelope.
+            with handle:
+                return io.BytesIO(self._crypto.decrypt(handle.read()))
+        except BaseException:
+            handle.close()
+            raise
+
+    def delete(self, user_id: int, content_hash: str) -> None:
+        self.path(user_id, content_hash).unlink(missing_ok=True)
+
+
+__all__ = ["AttachmentStore"]
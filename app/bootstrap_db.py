@@ -4,15 +4,19 @@ from __future__ import annotations
 from sqlalchemy import inspect
 
 from .database import Base, get_engine
+from .migrations import run_migrations, stamp_latest
 from .models import entities  # noqa: F401 - ensure models are registered
 
 
 def ensure_database() -> None:
-    """Create tables if they do not already exist."""
+    """Create missing tables and bring an existing schema up to the latest version."""
     engine = get_engine()
-    inspector = inspect(engine)
-    if not inspector.has_table("users"):
-        Base.metadata.create_all(engine)
+    fresh = not inspect(engine).has_table("users")
+    Base.metadata.create_all(engine)
+    if fresh:
+        stamp_latest(engine)
+    else:
+        run_migrations(engine)
 
 
 __all__ = ["ensure_database"]
@@ -0,0 +1,150 @@
+"""Compression applied to payloads before they are encrypted.
+
+The codec id is recorded in the high nibble of the envelope header (see
+:mod:`app.crypto`), so readers never have to guess. zstd is used when the
+optional ``zstandard`` package is installed.
+"""
+from __future__ import annotations
+
+import lzma
+import threading
+import zlib
+from typing import Callable, Dict, Tuple
+
+try:  # pragma: no cover - optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - gracefully degrade
+    zstandard = None  # type: ignore
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODEC_ZSTD = 3
+
+CODEC_NAMES = {CODEC_NONE: "none", CODEC_ZLIB: "zlib", CODEC_LZMA: "lzma", CODEC_ZSTD: "zstd"}
+
+COMPRESSION_THRESHOLD = 512
+MIN_COMPRESSION_THRESHOLD = 128
+MAX_COMPRESSION_THRESHOLD = 64 * 1024
+MIN_SAVING = 0.1
+# lzma is several times slower than zlib/zstd, so it must win by this much more.
+LZMA_MARGIN = 0.1
+SAMPLE_EVERY = 32
+FAILURES_BEFORE_RAISE = 8
+
+_COMPRESSORS: Dict[int, Callable[[bytes], bytes]] = {
+    CODEC_ZLIB: lambda data: zlib.compress(data, 6),
+    CODEC_LZMA: lambda data: lzma.compress(data, preset=6),
+}
+_DECOMPRESSORS: Dict[int, Callable[[bytes], bytes]] = {
+    CODEC_ZLIB: zlib.decompress,
+    CODEC_LZMA: lzma.decompress,
+}
+if zstandard is not None:  # pragma: no cover - optional dependency
+    _COMPRESSORS[CODEC_ZSTD] = lambda data: zstandard.ZstdCompressor(level=6).compress(data)
+    _DECOMPRESSORS[CODEC_ZSTD] = lambda data: zstandard.ZstdDecompressor().decompress(data)
+
+FAST_CODEC = CODEC_ZSTD if CODEC_ZSTD in _COMPRESSORS else CODEC_ZLIB
+
+
+def available_codecs() -> Tuple[int, ...]:
+    return tuple(sorted(_COMPRESSORS))
+
+
+def compress(codec: int, data: bytes) -> bytes:
+    return _COMPRESSORS[codec](data)
+
+
+def decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    decompressor = _DECOMPRESSORS.get(codec)
+    if decompressor is None:
+        name = CODEC_NAMES.get(codec, str(codec))
+        raise ValueError(f"Payload is compressed with unsupported codec {name}")
+    return decompressor(data)
+
+
+class CompressionPolicy:
+    """Decide per payload whether and how to compress it.
+
+    Payloads shorter than ``threshold`` bytes are stored as is. Longer ones
+    are compressed with the current codec and kept compressed only if that
+    saves at least ``min_saving`` of their size. Every ``sample_every``-th
+    compressed payload is also tried with every available codec and the
+    smallest result picks the codec for the ones that follow.
+
+    The threshold adapts to the data: it doubles after a run of payloads
+    just above it that did not compress, and halves when a sampled payload
+    just below it would have.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: int = COMPRESSION_THRESHOLD,
+        min_saving: float = MIN_SAVING,
+        sample_every: int = SAMPLE_EVERY,
+    ) -> None:
+        self.threshold = threshold
+        self.min_saving = min_saving
+        self.sample_every = sample_every
+        self.codec = FAST_CODEC
+        self._seen = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def encode(self, data: bytes) -> Tuple[int, bytes]:
+        """Return ``(codec, body)`` for ``data``; ``CODEC_NONE`` leaves it untouched."""
+        size = len(data)
+        with self._lock:
+            self._seen += 1
+            sample = self._seen % self.sample_every == 0
+            threshold, codec = self.threshold, self.codec
+        if size < threshold:
+            if sample and size >= threshold // 2 and self._saves(size, compress(codec, data)):
+                self._lower_threshold()
+            return CODEC_NONE, data
+        if sample:
+            codec = self._pick_codec(data)
+        body = compress(codec, data)
+        saved = self._saves(size, body)
+        if size < threshold * 2:
+            self._record_near_threshold(saved)
+        return (codec, body) if saved else (CODEC_NONE, data)
+
+    def _saves(self, size: int, body: bytes) -> bool:
+        return len(body) <= size * (1 - self.min_saving)
+
+    def _pick_codec(self, data: bytes) -> int:
+        sizes = {codec: len(compress(codec, data)) for codec in available_codecs()}
+        best = min(sizes, key=sizes.__getitem__)
+        if best == CODEC_LZMA and sizes[CODEC_LZMA] > sizes[FAST_CODEC] * (1 - LZMA_MARGIN):
+            best = FAST_CODEC
+        with self._lock:
+            self.codec = best
+        return best
+
+    def _record_near_threshold(self, saved: bool) -> None:
+        with self._lock:
+            self._failures = 0 if saved else self._failures + 1
+            if self._failures >= FAILURES_BEFORE_RAISE:
+                self._failures = 0
+                self.threshold = min(self.threshold * 2, MAX_COMPRESSION_THRESHOLD)
+
+    def _lower_threshold(self) -> None:
+        with self._lock:
+            self.threshold = max(self.threshold // 2, MIN_COMPRESSION_THRESHOLD)
+
+
+__all__ = [
+    "CODEC_LZMA",
+    "CODEC_NAMES",
+    "CODEC_NONE",
+    "CODEC_ZLIB",
+    "CODEC_ZSTD",
+    "CompressionPolicy",
+    "available_codecs",
+    "compress",
+    "decompress",
+]
@@ -27,6 +27,10 @@ class Paths:
     def attachments_dir(self) -> Path:
         return self.root / "attachments"
 
+    @property
+    def kdf_calibration(self) -> Path:
+        return self.root / "kdf_calibration.json"
+
 
 @dataclass(frozen=True)
 class SecurityConfig:
@@ -39,6 +43,11 @@ class SecurityConfig:
     password_hash_salt_len: int = 16
     encryption_key_iterations: int = 390_000
     encryption_key_length: int = 32
+    # Key-derivation calibration: aim for this unlock time, never below the floors.
+    kdf_target_seconds: float = 0.5
+    kdf_min_time_cost: int = 2
+    kdf_min_memory_cost: int = 19 * 1024
+    kdf_max_memory_cost: int = 2 ** 18  # KiB, i.e. 256 MiB
 
 
 paths = Paths()
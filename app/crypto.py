@@ -0,0 +1,353 @@
+"""Shared payload encryption used by the service layer.
+
+Payloads are sealed in a binary AES-GCM envelope::
+
+    header (1 byte) | nonce (12 bytes) | ciphertext + tag
+
+The header's low nibble is the envelope version and its high nibble the
+compression codec applied before encryption (see :mod:`app.compression`);
+the header is authenticated as associated data. Payload dictionaries are
+serialized by :mod:`app.serialization` first.
+
+Rows written before the envelope existed hold Fernet tokens, which always
+start with ``gAAAAA`` and are still decrypted.
+"""
+from __future__ import annotations
+
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from . import serialization
+from .compression import CODEC_NONE, CompressionPolicy, decompress
+from .crypto_stream import STREAM_CHUNK_SIZE, EncryptedStreamReader, EncryptedStreamWriter
+
+# Below this many items the pool hand-off costs more than it saves.
+PARALLEL_THRESHOLD = 256
+PAYLOAD_CACHE_BYTES = 32 * 1024 * 1024
+
+ENVELOPE_VERSION = 1
+NONCE_BYTES = 12
+LEGACY_TOKEN_PREFIX = b"gAAAAA"
+
+CacheKey = Tuple[str, Hashable]
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_context_lock = threading.Lock()
+_contexts: Dict[bytes, "CryptoContext"] = {}
+
+
+@functools.lru_cache(maxsize=8)
+def _fernet_for(key: bytes) -> Fernet:
+    return Fernet(key)
+
+
+@functools.lru_cache(maxsize=64)
+def _derive_subkey(key: bytes, purpose: str) -> bytes:
+    """32-byte subkey of the user's Fernet key, independent for every ``purpose``."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=f"kakha-study-hub/{purpose}".encode("utf-8"),
+    ).derive(base64.urlsafe_b64decode(key))
+
+
+@functools.lru_cache(maxsize=8)
+def _aead_for(key: bytes) -> AESGCM:
+    return AESGCM(_derive_subkey(key, "payload-aead"))
+
+
+def is_legacy_token(blob: bytes) -> bool:
+    return blob.startswith(LEGACY_TOKEN_PREFIX)
+
+
+def _seal(key: bytes, data: bytes, compression: Optional[CompressionPolicy] = None) -> bytes:
+    codec, body = compression.encode(data) if compression is not None else (CODEC_NONE, data)
+    header = bytes([(codec << 4) | ENVELOPE_VERSION])
+    nonce = os.urandom(NONCE_BYTES)
+    return header + nonce + _aead_for(key).encrypt(nonce, body, header)
+
+
+def _open(key: bytes, blob: bytes, compression: Optional[CompressionPolicy] = None) -> bytes:
+    if is_legacy_token(blob):
+        return _fernet_for(key).decrypt(blob)
+    header = blob[:1]
+    if not header or header[0] & 0x0F != ENVELOPE_VERSION:
+        raise ValueError("Unsupported payload envelope")
+    body = _aead_for(key).decrypt(blob[1 : 1 + NONCE_BYTES], blob[1 + NONCE_BYTES :], header)
+    return decompress(header[0] >> 4, body)
+
+
+def _reseal(key: bytes, blob: bytes, compression: Optional[CompressionPolicy] = None) -> bytes:
+    return _seal(key, _open(key, blob), compression)
+
+
+_TRANSFORMS = {"encrypt": _seal, "decrypt": _open, "reencrypt": _reseal}
+
+
+def _transform_chunk(
+    key: bytes,
+    operation: str,
+    chunk: Sequence[bytes],
+    compression: Optional[CompressionPolicy] = None,
+) -> List[bytes]:
+    """Apply ``operation`` to every item of a chunk, in order."""
+    transform = _TRANSFORMS[operation]
+    return [transform(key, item, compression) for item in chunk]
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    # AES-GCM and zlib release the GIL while they work, so threads can overlap
+    # without shipping the key to other processes.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="crypto"
+            )
+        return _executor
+
+
+def _shallow_copy(payload):
+    # Callers own what they receive; copying the top level keeps edits out of the cache.
+    return dict(payload) if isinstance(payload, dict) else payload
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    entries: int
+    size: int
+
+
+class PayloadCache:
+    """Size-bounded LRU of decrypted payloads.
+
+    Entries are keyed by ``(entity, id)`` and remember a digest of the
+    ciphertext they were decrypted from, so a row rewritten behind the
+    cache's back is treated as a miss rather than served stale. ``size``
+    counts plaintext bytes.
+    """
+
+    def __init__(self, max_bytes: int = PAYLOAD_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[bytes, dict, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(blob: bytes) -> bytes:
+        return hashlib.blake2b(blob, digest_size=16).digest()
+
+    def get(self, key: CacheKey, digest: bytes) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != digest:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _shallow_copy(entry[1])
+
+    def put(self, key: CacheKey, digest: bytes, payload: dict, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (digest, _shallow_copy(payload), size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def invalidate(self, entity: str, entity_id: Hashable) -> None:
+        with self._lock:
+            self._discard((entity, entity_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._entries), self._size)
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+
+class CryptoContext:
+    """Encrypt and decrypt payloads for one user key, fanning large batches out to a pool.
+
+    Batches of at least ``parallel_threshold`` items are split into chunks
+    and processed by a thread pool shared by every context. Results are
+    always returned in input order. Plaintext is compressed before
+    encryption as ``compression`` decides.
+    """
+
+    def __init__(
+        self,
+        key: bytes,
+        *,
+        parallel_threshold: int = PARALLEL_THRESHOLD,
+        compression: Optional[CompressionPolicy] = None,
+    ) -> None:
+        self._key = key
+        self.parallel_threshold = parallel_threshold
+        self.compression = compression or CompressionPolicy()
+        self.cache = PayloadCache()
+
+    def encrypt(self, data: bytes) -> bytes:
+        return _seal(self._key, data, self.compression)
+
+    def decrypt(self, token: bytes) -> bytes:
+        """Open an envelope or, for rows not yet migrated, a Fernet token."""
+        return _open(self._key, token)
+
+    def encrypt_payload(self, payload: dict) -> bytes:
+        return self.encrypt(serialization.dumps(payload))
+
+    def decrypt_payload(self, blob: bytes, cache_key: Optional[CacheKey] = None) -> dict:
+        """Decrypt a payload, consulting the cache when ``cache_key`` is given."""
+        if cache_key is None:
+            return serialization.loads(self.decrypt(blob))
+        return self.decrypt_payloads([blob], [cache_key])[0]
+
+    def encrypt_many(self, items: Iterable[bytes]) -> List[bytes]:
+        return self._map("encrypt", list(items))
+
+    def decrypt_many(self, tokens: Iterable[bytes]) -> List[bytes]:
+        return self._map("decrypt", list(tokens))
+
+    def reencrypt_many(self, tokens: Iterable[bytes]) -> List[bytes]:
+        """Rewrite Fernet tokens (or envelopes) as fresh envelopes without parsing them."""
+        return self._map("reencrypt", list(tokens))
+
+    def encrypt_payloads(self, payloads: Iterable[dict]) -> List[bytes]:
+        return self.encrypt_many(serialization.dumps(payload) for payload in payloads)
+
+    def decrypt_payloads(
+        self, blobs: Iterable[bytes], cache_keys: Optional[Sequence[CacheKey]] = None
+    ) -> List[dict]:
+        """Decrypt payloads; with ``cache_keys`` only cache misses are decrypted."""
+        blobs = list(blobs)
+        if cache_keys is None:
+            return [serialization.loads(data) for data in self.decrypt_many(blobs)]
+        results: List[Optional[dict]] = []
+        pending: List[int] = []
+        digests = [PayloadCache.digest(blob) for blob in blobs]
+        for index, (key, digest) in enumerate(zip(cache_keys, digests)):
+            payload = self.cache.get(key, digest)
+            results.append(payload)
+            if payload is None:
+                pending.append(index)
+        decrypted = self.decrypt_many(blobs[index] for index in pending)
+        for index, data in zip(pending, decrypted):
+            payload = serialization.loads(data)
+            self.cache.put(cache_keys[index], digests[index], payload, len(data))
+            results[index] = payload
+        return results  # type: ignore[return-value]
+
+    def keyed_hash(self, purpose: str, data: bytes) -> bytes:
+        """HMAC-SHA256 of ``data`` under a subkey derived from the user key for ``purpose``.
+
+        Distinct purposes yield unrelated digests, so a fingerprint can never
+        be matched against a search token or vice versa.
+        """
+        return hmac.digest(_derive_subkey(self._key, purpose), data, "sha256")
+
+    def keyed_hasher(self, purpose: str) -> "hmac.HMAC":
+        """Incremental form of :meth:`keyed_hash` for data too large to hold in memory."""
+        return hmac.new(_derive_subkey(self._key, purpose), digestmod=hashlib.sha256)
+
+    def stream_writer(
+        self, fileobj: BinaryIO, *, chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> EncryptedStreamWriter:
+        """Encrypt what is written to the returned writer into ``fileobj`` in chunks."""
+        return EncryptedStreamWriter(
+            AESGCM(_derive_subkey(self._key, "stream-aead")), fileobj, chunk_size=chunk_size
+        )
+
+    def stream_reader(self, fileobj: BinaryIO) -> EncryptedStreamReader:
+        """Seekable plaintext view of a stream written by :meth:`stream_writer`."""
+        return EncryptedStreamReader(AESGCM(_derive_subkey(self._key, "stream-aead")), fileobj)
+
+    def forget(self, entity: str, entity_id: Hashable) -> None:
+        """Drop the cached plaintext of a row that was rewritten or deleted."""
+        self.cache.invalidate(entity, entity_id)
+
+    def _map(self, operation: str, items: List[bytes]) -> List[bytes]:
+        workers = os.cpu_count() or 1
+        # With a single core the hand-off to the pool is pure overhead.
+        if len(items) < self.parallel_threshold or workers == 1:
+            return _transform_chunk(self._key, operation, items, self.compression)
+        executor = _shared_executor()
+        chunk_size = max(self.parallel_threshold // 4, -(-len(items) // (workers * 4)))
+        chunks = [items[start : start + chunk_size] for start in range(0, len(items), chunk_size)]
+        results: List[bytes] = []
+        repeat = len(chunks)
+        for chunk in executor.map(
+            _transform_chunk,
+            [self._key] * repeat,
+            [operation] * repeat,
+            chunks,
+            [self.compression] * repeat,
+        ):
+            results.extend(chunk)
+        return results
+
+
+def get_crypto_context(key: bytes) -> CryptoContext:
+    """Return the context shared by every service working with ``key``."""
+    with _context_lock:
+        context = _contexts.get(key)
+        if context is None:
+            context = CryptoContext(key)
+            _contexts[key] = context
+        return context
+
+
+def release_crypto_contexts() -> None:
+    """Wipe every cached payload and context, e.g. when the user signs out."""
+    with _context_lock:
+        for context in _contexts.values():
+            context.cache.clear()
+        _contexts.clear()
+    _fernet_for.cache_clear()
+    _aead_for.cache_clear()
+    _derive_subkey.cache_clear()
+
+
+__all__ = [
+    "CacheStats",
+    "CryptoContext",
+    "ENVELOPE_VERSION",
+    "LEGACY_TOKEN_PREFIX",
+    "PARALLEL_THRESHOLD",
+    "PayloadCache",
+    "get_crypto_context",
+    "is_legacy_token",
+    "release_crypto_contexts",
+]
@@ -0,0 +1,164 @@
+"""Chunked authenticated encryption for large files.
+
+A stream is laid out as::
+
+    header: magic "KSS1" | chunk size (uint32) | nonce prefix (8 bytes)
+    chunk*: AES-GCM ciphertext of ``chunk size`` bytes (the last may be shorter) + 16-byte tag
+
+Chunk ``i`` uses the nonce ``prefix || i`` and authenticates the header, its
+index and whether it is the final chunk, so chunks cannot be reordered,
+dropped or cut off at a boundary without decryption failing. Every chunk
+sits at a fixed offset, so a reader can seek anywhere and decrypt only
+the chunks it touches; memory use is one chunk regardless of file size.
+"""
+from __future__ import annotations
+
+import io
+import os
+import struct
+from typing import BinaryIO, Optional, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+STREAM_MAGIC = b"KSS1"
+STREAM_CHUNK_SIZE = 64 * 1024
+TAG_BYTES = 16
+_HEADER = struct.Struct(">4sI8s")
+_NONCE_INDEX = struct.Struct(">I")
+_CHUNK_AAD = struct.Struct(">QB")
+
+
+def is_stream(prefix: bytes) -> bool:
+    return prefix[: len(STREAM_MAGIC)] == STREAM_MAGIC
+
+
+def _chunk_aad(header: bytes, index: int, final: bool) -> bytes:
+    return header + _CHUNK_AAD.pack(index, final)
+
+
+class EncryptedStreamWriter(io.RawIOBase):
+    """Encrypt everything written to it into ``fileobj``, one chunk at a time.
+
+    :meth:`close` seals the final chunk; it does not close ``fileobj``.
+    """
+
+    def __init__(self, aead: AESGCM, fileobj: BinaryIO, *, chunk_size: int = STREAM_CHUNK_SIZE):
+        super().__init__()
+        self._aead = aead
+        self._fileobj = fileobj
+        self._chunk_size = chunk_size
+        self._prefix = os.urandom(8)
+        self._header = _HEADER.pack(STREAM_MAGIC, chunk_size, self._prefix)
+        self._buffer = bytearray()
+        self._index = 0
+        fileobj.write(self._header)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        # Keep at least one byte back: only close() knows which chunk is final.
+        while len(self._buffer) > self._chunk_size:
+            self._emit(bytes(self._buffer[: self._chunk_size]), final=False)
+            del self._buffer[: self._chunk_size]
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._emit(bytes(self._buffer), final=True)
+            self._buffer.clear()
+            self._fileobj.flush()
+        super().close()
+
+    def _emit(self, chunk: bytes, *, final: bool) -> None:
+        nonce = self._prefix + _NONCE_INDEX.pack(self._index)
+        aad = _chunk_aad(self._header, self._index, final)
+        self._fileobj.write(self._aead.encrypt(nonce, chunk, aad))
+        self._index += 1
+
+
+class EncryptedStreamReader(io.RawIOBase):
+    """Seekable, read-only view of the plaintext of an encrypted stream.
+
+    Closing the reader closes ``fileobj``.
+    """
+
+    def __init__(self, aead: AESGCM, fileobj: BinaryIO) -> None:
+        super().__init__()
+        self._aead = aead
+        self._fileobj = fileobj
+        self._header = fileobj.read(_HEADER.size)
+        if len(self._header) != _HEADER.size or not is_stream(self._header):
+            raise ValueError("Not an encrypted stream")
+        _, self._chunk_size, self._prefix = _HEADER.unpack(self._header)
+        body = fileobj.seek(0, io.SEEK_END) - _HEADER.size
+        stride = self._chunk_size + TAG_BYTES
+        self._chunk_count = max(1, -(-body // stride))
+        self.size = body - self._chunk_count * TAG_BYTES
+        if self.size < 0:
+            raise ValueError("Encrypted stream is truncated")
+        self._position = 0
+        self._cached: Optional[Tuple[int, bytes]] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        # Fill across chunk boundaries so read(n) only comes back short at the end.
+        while filled < len(view) and self._position < self.size:
+            index, start = divmod(self._position, self._chunk_size)
+            chunk = self._chunk(index)
+            count = min(len(view) - filled, len(chunk) - start)
+            view[filled : filled + count] = chunk[start : start + count]
+            filled += count
+            self._position += count
+        return filled
+
+    def close(self) -> None:
+        if not self.closed:
+            self._fileobj.close()
+            self._cached = None
+        super().close()
+
+    def _chunk(self, index: int) -> bytes:
+        if self._cached is not None and self._cached[0] == index:
+            return self._cached[1]
+        stride = self._chunk_size + TAG_BYTES
+        self._fileobj.seek(_HEADER.size + index * stride)
+        ciphertext = self._fileobj.read(stride)
+        nonce = self._prefix + _NONCE_INDEX.pack(index)
+        aad = _chunk_aad(self._header, index, index == self._chunk_count - 1)
+        chunk = self._aead.decrypt(nonce, ciphertext, aad)
+        self._cached = (index, chunk)
+        return chunk
+
+
+__all__ = [
+    "EncryptedStreamReader",
+    "EncryptedStreamWriter",
+    "STREAM_CHUNK_SIZE",
+    "is_stream",
+]
@@ -1,40 +1,164 @@
 """Import basic cards from Anki .apkg collections."""
 from __future__ import annotations
 
+import datetime as dt
+import itertools
 import json
+import shutil
 import sqlite3
 import tempfile
 import zipfile
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from .base import CardImporter
 
+# Newer exports ship ``collection.anki21`` next to a placeholder ``collection.anki2``.
+COLLECTION_NAMES = ("collection.anki21", "collection.anki2")
+NOTE_BATCH_SIZE = 500
+# Anki answer buttons (Again, Hard, Good, Easy) mapped onto SM-2 quality ratings.
+ANKI_EASE_TO_RATING = {1: 1, 2: 3, 3: 4, 4: 5}
+
 
 class AnkiImporter(CardImporter):
+    """Stream notes from an Anki export together with their review history.
+
+    Each record carries the note's first card's ``revlog`` entries as
+    ``history`` and its current scheduling as ``state`` so that
+    :meth:`FlashcardService.bulk_import` can restore SM-2 progress.
+    """
+
+    def __init__(self, batch_size: int = NOTE_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+
     def load(self, path: Path) -> Iterable[dict]:
         with tempfile.TemporaryDirectory() as temp_dir:
-            with zipfile.ZipFile(path, "r") as archive:
-                archive.extractall(temp_dir)
-            collection_path = Path(temp_dir) / "collection.anki2"
-            if not collection_path.exists():
-                return []
+            collection_path = self._extract_collection(path, Path(temp_dir))
+            if collection_path is None:
+                return
             connection = sqlite3.connect(collection_path)
-            cursor = connection.cursor()
-            model_map = self._load_models_from_db(cursor)
-            cursor.execute("SELECT flds, mid FROM notes")
-            for fields_raw, model_id in cursor.fetchall():
-                fields = fields_raw.split("\x1f")
-                front = fields[0]
-                back = fields[1] if len(fields) > 1 else ""
-                model = model_map.get(str(model_id), {})
-                yield {
-                    "front": front,
-                    "back": back,
-                    "card_type": model.get("type", "basic"),
-                    "metadata": {"model": model.get("name", "Unknown")},
-                }
-            connection.close()
+            try:
+                cursor = connection.cursor()
+                model_map = self._load_models_from_db(cursor)
+                created = self._collection_created(cursor)
+                histories = self._iter_histories(connection)
+                pending = next(histories, None)
+                cursor.execute(
+                    "SELECT n.id, n.flds, n.mid, c.type, c.queue, c.due, c.odue, c.odid, "
+                    "c.ivl, c.factor, c.lapses "
+                    "FROM notes n LEFT JOIN cards c ON c.nid = n.id AND c.ord = 0 "
+                    "ORDER BY n.id"
+                )
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    for note_id, fields_raw, model_id, *card in rows:
+                        while pending is not None and pending[0] < note_id:
+                            pending = next(histories, None)
+                        history: List[dict] = []
+                        if pending is not None and pending[0] == note_id:
+                            history = pending[1]
+                            pending = next(histories, None)
+                        fields = fields_raw.split("\x1f")
+                        front = fields[0]
+                        back = fields[1] if len(fields) > 1 else ""
+                        model = model_map.get(str(model_id), {})
+                        record = {
+                            "front": front,
+                            "back": back,
+                            "card_type": model.get("type", "basic"),
+                            "metadata": {"model": model.get("name", "Unknown")},
+                        }
+                        if history:
+                            record["history"] = history
+                        state = self._card_state(card, history, created)
+                        if state is not None:
+                            record["state"] = state
+                        yield record
+            finally:
+                connection.close()
+
+    def _iter_histories(self, connection: sqlite3.Connection) -> Iterator[Tuple[int, List[dict]]]:
+        """Yield ``(note_id, review_logs)`` in note order, reading the revlog in batches."""
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT c.nid, r.id, r.ease, r.ivl, r.factor FROM revlog r "
+            "JOIN cards c ON c.id = r.cid AND c.ord = 0 "
+            "WHERE r.ease > 0 ORDER BY c.nid, r.id"
+        )
+
+        def rows() -> Iterator[tuple]:
+            while True:
+                batch = cursor.fetchmany(self.batch_size * 4)
+                if not batch:
+                    return
+                yield from batch
+
+        for note_id, entries in itertools.groupby(rows(), key=lambda row: row[0]):
+            yield note_id, [self._review_log(*entry[1:]) for entry in entries]
+
+    @staticmethod
+    def _review_log(revlog_id: int, ease: int, ivl: int, factor: int) -> dict:
+        reviewed_at = dt.datetime.utcfromtimestamp(revlog_id / 1000)
+        # Negative intervals are learning steps in seconds, positive ones are days.
+        delay = dt.timedelta(seconds=-ivl) if ivl < 0 else dt.timedelta(days=ivl)
+        return {
+            "reviewed_at": reviewed_at,
+            "scheduled_at": reviewed_at + delay,
+            "rating": ANKI_EASE_TO_RATING.get(ease, 0),
+            "interval": max(ivl, 0),
+            "ease_factor": factor / 1000 if factor else 2.5,
+        }
+
+    @staticmethod
+    def _card_state(card: Sequence, history: List[dict], created: int) -> Optional[dict]:
+        card_kind, queue, due, original_due, original_deck, ivl, factor, lapses = card
+        if card_kind is None or card_kind == 0:
+            return None
+        # Cards moved into a filtered deck keep their real due date in ``odue``.
+        if original_deck and original_due:
+            due = original_due
+        if due is None:
+            return None
+        # Learning and relearning cards store an epoch timestamp, whatever queue
+        # they are suspended or buried in; only the day-learning queue (3) and
+        # review cards count days from the collection's creation.
+        if card_kind in (1, 3) and queue != 3:
+            due_at = dt.datetime.utcfromtimestamp(due)
+        else:
+            due_at = dt.datetime.utcfromtimestamp(created) + dt.timedelta(days=due)
+        repetitions = 0
+        for log in reversed(history):
+            if log["rating"] < 3:
+                break
+            repetitions += 1
+        return {
+            "due_at": due_at,
+            "interval": max(ivl or 0, 0),
+            "ease_factor": factor / 1000 if factor else 2.5,
+            "repetitions": repetitions,
+            "lapses": lapses or 0,
+            "last_reviewed_at": history[-1]["reviewed_at"] if history else None,
+        }
+
+    @staticmethod
+    def _collection_created(cursor) -> int:
+        cursor.execute("SELECT crt FROM col")
+        row = cursor.fetchone()
+        return int(row[0]) if row and row[0] else 0
+
+    def _extract_collection(self, path: Path, target_dir: Path) -> Optional[Path]:
+        """Copy only the collection database out of the archive, skipping media files."""
+        with zipfile.ZipFile(path, "r") as archive:
+            names = set(archive.namelist())
+            for name in COLLECTION_NAMES:
+                if name in names:
+                    target = target_dir / name
+                    with archive.open(name) as source, target.open("wb") as destination:
+                        shutil.copyfileobj(source, destination, 1024 * 1024)
+                    return target
+        return None
 
     def _load_models_from_db(self, cursor) -> dict:
         cursor.execute("SELECT models FROM col")
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import re
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, List
 
 from .base import CardImporter
 
@@ -13,12 +13,31 @@ SEPARATOR = "---"
 
 class MarkdownImporter(CardImporter):
     def load(self, path: Path) -> Iterable[dict]:
-        text = path.read_text(encoding="utf-8")
-        cards = text.split(SEPARATOR)
-        for block in cards:
-            lines = [line.strip() for line in block.strip().splitlines() if line.strip()]
-            if not lines:
-                continue
-            front = lines[0]
-            back = "\n".join(lines[1:]) if len(lines) > 1 else ""
-            yield {"front": front, "back": back, "card_type": "basic", "metadata": {"format": "markdown"}}
+        with path.open("r", encoding="utf-8") as handle:
+            yield from self._parse(handle)
+
+    def _parse(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Split ``---``-separated blocks while holding only the current block in memory."""
+        block: List[str] = []
+        for raw_line in lines:
+            # A separator may sit anywhere on a line; text around it belongs to both blocks.
+            *finished, remainder = raw_line.split(SEPARATOR)
+            for piece in finished:
+                block.append(piece)
+                card = self._card_from_block(block)
+                if card is not None:
+                    yield card
+                block = []
+            block.append(remainder)
+        card = self._card_from_block(block)
+        if card is not None:
+            yield card
+
+    @staticmethod
+    def _card_from_block(pieces: List[str]) -> dict | None:
+        lines = [line.strip() for line in "".join(pieces).strip().splitlines() if line.strip()]
+        if not lines:
+            return None
+        front = lines[0]
+        back = "\n".join(lines[1:]) if len(lines) > 1 else ""
+        return {"front": front, "back": back, "card_type": "basic", "metadata": {"format": "markdown"}}
@@ -1,17 +1,31 @@
 """Import flashcards from bulk pasted text."""
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from .base import CardImporter
 
 
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of ``text`` one at a time instead of materializing ``splitlines()``."""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end == -1:
+            end = length
+        yield text[start:end].rstrip("\r")
+        start = end + 1
+
+
 class BulkPasteImporter(CardImporter):
     def __init__(self, text: str) -> None:
         self.text = text
 
     def load(self, _) -> Iterable[dict]:
-        for line in self.text.strip().splitlines():
+        for line in _iter_lines(self.text):
+            if not line.strip():
+                continue
             if "::" in line:
                 front, back = line.split("::", 1)
             else:
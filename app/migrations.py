@@ -0,0 +1,215 @@
+"""Versioned schema migrations keyed on SQLite's ``PRAGMA user_version``."""
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List
+
+from sqlalchemy.engine import Connection, Engine
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _create_indexes(*statements: str) -> Callable[[Connection], None]:
+    def apply(connection: Connection) -> None:
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+
+    return apply
+
+
+def _add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    def apply(connection: Connection) -> None:
+        columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    return apply
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def apply(connection: Connection) -> None:
+        for step in steps:
+            step(connection)
+
+    return apply
+
+
+def _backfill_card_states(connection: Connection) -> None:
+    """Seed card_states from the latest review log of cards reviewed before it existed."""
+    connection.exec_driver_sql(
+        """
+        INSERT INTO card_states (
+            flashcard_id, user_id, due_at, interval, ease_factor,
+            repetitions, lapses, last_reviewed_at
+        )
+        SELECT
+            f.id,
+            f.user_id,
+            r.scheduled_at,
+            COALESCE(r.interval, 0),
+            COALESCE(r.ease_factor, 2.5),
+            (
+                SELECT COUNT(*) FROM review_logs ok
+                WHERE ok.flashcard_id = f.id AND COALESCE(ok.rating, 0) >= 3 AND ok.id > COALESCE(
+                    (SELECT MAX(fail.id) FROM review_logs fail
+                     WHERE fail.flashcard_id = f.id AND COALESCE(fail.rating, 0) < 3),
+                    0
+                )
+            ),
+            -- Like _CardProgress.advance: a failure is a lapse only right after a success.
+            (
+                SELECT COUNT(*) FROM review_logs fail
+                WHERE fail.flashcard_id = f.id AND COALESCE(fail.rating, 0) < 3 AND (
+                    SELECT COALESCE(prev.rating, 0) FROM review_logs prev
+                    WHERE prev.flashcard_id = f.id AND prev.id < fail.id
+                    ORDER BY prev.id DESC LIMIT 1
+                ) >= 3
+            ),
+            r.reviewed_at
+        FROM review_logs r
+        JOIN flashcards f ON f.id = r.flashcard_id
+        WHERE r.id = (SELECT MAX(id) FROM review_logs WHERE flashcard_id = r.flashcard_id)
+          AND NOT EXISTS (SELECT 1 FROM card_states s WHERE s.flashcard_id = f.id)
+        """
+    )
+
+
+def _move_attachments_out_of_line(connection: Connection) -> None:
+    """Rebuild ``attachments`` with a nullable blob plus the content-store columns.
+
+    SQLite cannot relax ``NOT NULL`` in place, so the table is copied.
+    """
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(attachments)")}
+    if "content_hash" in columns:
+        return
+    for statement in (
+        # Left over if a copy was interrupted before migrations were transactional.
+        "DROP TABLE IF EXISTS attachments_new",
+        """
+        CREATE TABLE attachments_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            task_id INTEGER NOT NULL REFERENCES lab_tasks (id) ON DELETE CASCADE,
+            filename VARCHAR(255) NOT NULL,
+            blob BLOB,
+            content_hash VARCHAR(64),
+            size INTEGER,
+            created_at DATETIME
+        )
+        """,
+        """
+        INSERT INTO attachments_new (id, task_id, filename, blob, size, created_at)
+        SELECT id, task_id, filename, blob, length(blob), created_at FROM attachments
+        """,
+        "DROP TABLE attachments",
+        "ALTER TABLE attachments_new RENAME TO attachments",
+        "CREATE INDEX ix_attachments_task_id ON attachments (task_id)",
+        "CREATE INDEX ix_attachments_content_hash ON attachments (content_hash)",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "secondary indexes for per-user and parent lookups",
+        _create_indexes(
+            "CREATE INDEX IF NOT EXISTS ix_decks_user_id ON decks (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_flashcards_user_id ON flashcards (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_review_logs_flashcard_id ON review_logs (flashcard_id)",
+            "CREATE INDEX IF NOT EXISTS ix_card_states_user_due ON card_states (user_id, due_at)",
+            "CREATE INDEX IF NOT EXISTS ix_quiz_questions_user_id ON quiz_questions (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_quiz_attempts_user_started "
+            "ON quiz_attempts (user_id, started_at)",
+            "CREATE INDEX IF NOT EXISTS ix_quiz_responses_attempt_id ON quiz_responses (attempt_id)",
+            "CREATE INDEX IF NOT EXISTS ix_lab_checklists_user_id ON lab_checklists (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_lab_tasks_checklist_id ON lab_tasks (checklist_id)",
+            "CREATE INDEX IF NOT EXISTS ix_attachments_task_id ON attachments (task_id)",
+            "CREATE INDEX IF NOT EXISTS ix_content_packs_user_id ON content_packs (user_id)",
+        ),
+    ),
+    Migration(2, "backfill card states from review history", _backfill_card_states),
+    Migration(
+        3,
+        "flashcard duplicate fingerprints",
+        _steps(
+            _add_column("flashcards", "fingerprint", "VARCHAR(64)"),
+            _create_indexes(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_flashcards_user_fingerprint "
+                "ON flashcards (user_id, fingerprint)"
+            ),
+        ),
+    ),
+    Migration(4, "per-user key derivation parameters", _add_column("users", "kdf_params", "JSON")),
+    Migration(5, "content-addressed attachment store", _move_attachments_out_of_line),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(connection: Connection) -> int:
+    return int(connection.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+
+
+def _set_schema_version(connection: Connection, version: int) -> None:
+    # PRAGMA arguments cannot be bound parameters; ``version`` is always an int.
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def stamp_latest(engine: Engine) -> None:
+    """Mark a freshly created schema as up to date without running migrations."""
+    with engine.begin() as connection:
+        _set_schema_version(connection, LATEST_VERSION)
+
+
+@contextmanager
+def _transaction(engine: Engine) -> Iterator[Connection]:
+    """A connection inside an explicit ``BEGIN``.
+
+    pysqlite only opens a transaction implicitly before DML, so DDL run
+    under ``engine.begin()`` is committed as it goes. With the driver in
+    autocommit mode and the transaction begun by hand, schema changes roll
+    back together with everything else.
+    """
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.exec_driver_sql("BEGIN")
+        try:
+            yield connection
+        except BaseException:
+            connection.exec_driver_sql("ROLLBACK")
+            raise
+        connection.exec_driver_sql("COMMIT")
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply every pending migration, each in its own transaction, and return the new version."""
+    with engine.connect() as connection:
+        version = get_schema_version(connection)
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        LOGGER.info("Applying schema migration %s: %s", migration.version, migration.description)
+        with _transaction(engine) as connection:
+            migration.apply(connection)
+            _set_schema_version(connection, migration.version)
+        version = migration.version
+    return version
+
+
+__all__ = [
+    "LATEST_VERSION",
+    "MIGRATIONS",
+    "Migration",
+    "get_schema_version",
+    "run_migrations",
+    "stamp_latest",
+]
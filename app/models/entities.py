@@ -11,6 +11,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     LargeBinary,
     Numeric,
@@ -18,7 +19,7 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from ..database import Base
 
@@ -31,6 +32,8 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     password_salt = Column(LargeBinary(64), nullable=False)
     encryption_blob = Column(LargeBinary, nullable=False)
+    # Argon2id cost used for the key hierarchy; NULL means the SecurityConfig defaults.
+    kdf_params = Column(JSON)
     created_at = Column(DateTime, default=dt.datetime.utcnow)
     hello_enabled = Column(Boolean, default=False)
 
@@ -51,7 +54,9 @@ class Deck(Base):
     __tablename__ = "decks"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     name = Column(String(128), nullable=False)
     parent_id = Column(Integer, ForeignKey("decks.id"))
     description = Column(Text)
@@ -82,24 +87,38 @@ class Flashcard(Base):
     __tablename__ = "flashcards"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"))
     card_type = Column(String(32), nullable=False)
-    data = Column(LargeBinary, nullable=False)
+    # Encrypted columns are deferred throughout; queries that decrypt them opt in with undefer().
+    data = deferred(Column(LargeBinary, nullable=False))
     metadata_json = Column("metadata", JSON, default=dict)
+    # Keyed HMAC of the normalized front/back, used to skip duplicates without decrypting.
+    fingerprint = Column(String(64))
     created_at = Column(DateTime, default=dt.datetime.utcnow)
     updated_at = Column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
     user = relationship("User", back_populates="flashcards")
     deck = relationship("Deck", back_populates="flashcards")
     reviews = relationship("ReviewLog", back_populates="flashcard", cascade="all, delete-orphan")
+    state = relationship(
+        "CardState", back_populates="flashcard", uselist=False, cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        Index("uq_flashcards_user_fingerprint", "user_id", "fingerprint", unique=True),
+    )
 
 
 class ReviewLog(Base):
     __tablename__ = "review_logs"
 
     id = Column(Integer, primary_key=True)
-    flashcard_id = Column(Integer, ForeignKey("flashcards.id", ondelete="CASCADE"), nullable=False)
+    flashcard_id = Column(
+        Integer, ForeignKey("flashcards.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     scheduled_at = Column(DateTime, nullable=False)
     reviewed_at = Column(DateTime)
     rating = Column(Integer)
@@ -109,6 +128,43 @@ class ReviewLog(Base):
     flashcard = relationship("Flashcard", back_populates="reviews")
 
 
+class CardState(Base):
+    """Materialized SM-2 state of a flashcard, maintained alongside its review logs."""
+
+    __tablename__ = "card_states"
+
+    flashcard_id = Column(
+        Integer, ForeignKey("flashcards.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    interval = Column(Integer, nullable=False, default=0)
+    ease_factor = Column(Numeric(5, 2), nullable=False, default=2.5)
+    repetitions = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    last_reviewed_at = Column(DateTime)
+
+    flashcard = relationship("Flashcard", back_populates="state")
+
+    __table_args__ = (Index("ix_card_states_user_due", "user_id", "due_at"),)
+
+
+class SearchToken(Base):
+    """Blind search index: keyed hashes of the words in encrypted flashcards and questions."""
+
+    __tablename__ = "search_tokens"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    token_hash = Column(LargeBinary(16), primary_key=True)
+    entity = Column(String(32), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_search_tokens_entity", "entity", "entity_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+
 class ExamBlueprint(Base):
     __tablename__ = "exam_blueprints"
 
@@ -141,12 +197,14 @@ class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     blueprint_section_id = Column(Integer, ForeignKey("blueprint_sections.id"))
     question_type = Column(String(32), nullable=False)
-    prompt = Column(LargeBinary, nullable=False)
-    answer = Column(LargeBinary, nullable=False)
-    explanation = Column(LargeBinary)
+    prompt = deferred(Column(LargeBinary, nullable=False))
+    answer = deferred(Column(LargeBinary, nullable=False))
+    explanation = deferred(Column(LargeBinary))
     references = Column(JSON, default=list)
     metadata_json = Column("metadata", JSON, default=dict)
 
@@ -166,14 +224,18 @@ class QuizAttempt(Base):
         "QuizResponse", back_populates="attempt", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (Index("ix_quiz_attempts_user_started", "user_id", "started_at"),)
+
 
 class QuizResponse(Base):
     __tablename__ = "quiz_responses"
 
     id = Column(Integer, primary_key=True)
-    attempt_id = Column(Integer, ForeignKey("quiz_attempts.id", ondelete="CASCADE"), nullable=False)
+    attempt_id = Column(
+        Integer, ForeignKey("quiz_attempts.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     question_id = Column(Integer, ForeignKey("quiz_questions.id"), nullable=False)
-    user_answer = Column(LargeBinary, nullable=False)
+    user_answer = deferred(Column(LargeBinary, nullable=False))
     is_correct = Column(Boolean, default=False)
     confidence = Column(Integer)
 
@@ -198,7 +260,9 @@ class LabChecklist(Base):
     __tablename__ = "lab_checklists"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     name = Column(String(128), nullable=False)
     description = Column(Text)
 
@@ -211,11 +275,11 @@ class LabTask(Base):
 
     id = Column(Integer, primary_key=True)
     checklist_id = Column(
-        Integer, ForeignKey("lab_checklists.id", ondelete="CASCADE"), nullable=False
+        Integer, ForeignKey("lab_checklists.id", ondelete="CASCADE"), nullable=False, index=True
     )
     name = Column(String(128), nullable=False)
     status = Column(String(16), default="To-do")
-    notes = Column(LargeBinary)
+    notes = deferred(Column(LargeBinary))
 
     checklist = relationship("LabChecklist", back_populates="tasks")
     attachments = relationship(
@@ -227,9 +291,14 @@ class Attachment(Base):
     __tablename__ = "attachments"
 
     id = Column(Integer, primary_key=True)
-    task_id = Column(Integer, ForeignKey("lab_tasks.id", ondelete="CASCADE"), nullable=False)
+    task_id = Column(
+        Integer, ForeignKey("lab_tasks.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     filename = Column(String(255), nullable=False)
-    blob = Column(LargeBinary, nullable=False)
+    # Only rows written before the attachment store existed keep their bytes inline.
+    blob = deferred(Column(LargeBinary))
+    content_hash = Column(String(64), index=True)
+    size = Column(Integer)
     created_at = Column(DateTime, default=dt.datetime.utcnow)
 
     task = relationship("LabTask", back_populates="attachments")
@@ -239,12 +308,14 @@ class ContentPack(Base):
     __tablename__ = "content_packs"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     name = Column(String(128), nullable=False)
     version = Column(String(32), nullable=False)
     checksum = Column(String(128), nullable=False)
     metadata_json = Column("metadata", JSON, default=dict)
-    manifest = Column(LargeBinary, nullable=False)
+    manifest = deferred(Column(LargeBinary, nullable=False))
     installed_at = Column(DateTime, default=dt.datetime.utcnow)
 
     user = relationship("User", back_populates="content_packs")
@@ -3,7 +3,9 @@ from .analytics_repository import AnalyticsRepository
 from .content_pack_repository import ContentPackRepository
 from .flashcard_repository import FlashcardRepository
 from .lab_repository import LabRepository
+from .payload_repository import PayloadRepository
 from .quiz_repository import QuizRepository
+from .search_repository import SearchRepository
 from .user_repository import UserRepository
 
 __all__ = [
@@ -11,6 +13,8 @@ __all__ = [
     "ContentPackRepository",
     "FlashcardRepository",
     "LabRepository",
+    "PayloadRepository",
     "QuizRepository",
+    "SearchRepository",
     "UserRepository",
 ]
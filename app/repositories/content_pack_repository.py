@@ -1,12 +1,21 @@
 """Repository for managing content packs."""
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, undefer
 
 from ..models.entities import ContentPack
 
+_packs = ContentPack.__table__
+
+# Built once so the compiled statement is reused; see flashcard_repository.
+_PACK_ROWS = select(
+    _packs.c.id, _packs.c.name, _packs.c.version, _packs.c.checksum, _packs.c.manifest
+).where(_packs.c.user_id == bindparam("user_id"))
+
 
 class ContentPackRepository:
     def __init__(self, session: Session) -> None:
@@ -27,5 +36,14 @@ class ContentPackRepository:
         self.session.flush()
         return pack
 
-    def list_packs(self, user_id: int) -> List[ContentPack]:
-        return self.session.query(ContentPack).filter(ContentPack.user_id == user_id).all()
+    def list_pack_rows(self, user_id: int) -> List[Row]:
+        """``(id, name, version, checksum, manifest)`` of each installed pack."""
+        return self.session.execute(_PACK_ROWS, {"user_id": user_id}).all()
+
+    def get_pack(self, user_id: int, pack_id: int) -> Optional[ContentPack]:
+        return (
+            self.session.query(ContentPack)
+            .options(undefer(ContentPack.manifest))
+            .filter(ContentPack.user_id == user_id, ContentPack.id == pack_id)
+            .one_or_none()
+        )
@@ -1,19 +1,51 @@
 """Repository for flashcard persistence."""
 from __future__ import annotations
 
-from typing import Iterable, List, Optional
+import datetime as dt
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Text, bindparam, insert, select, type_coerce
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, undefer
 
-from ..models.entities import Deck, Flashcard, ReviewLog
+from ..models.entities import CardState, Deck, Flashcard, ReviewLog
+
+_decks = Deck.__table__
+_flashcards = Flashcard.__table__
+
+# Read-only listings select plain columns through Core: rows come back as
+# tuples without identity-map bookkeeping, and because the statements are
+# built once with a bound user id their compiled form is reused from
+# SQLAlchemy's statement cache. Columns are labelled like the mapped
+# attributes so the rows read the same as entities.
+_DECK_ROWS = select(
+    _decks.c.id, _decks.c.name, _decks.c.description, _decks.c.parent_id
+).where(_decks.c.user_id == bindparam("user_id"))
+_FLASHCARD_ROWS = select(
+    _flashcards.c.id,
+    _flashcards.c.deck_id,
+    _flashcards.c.card_type,
+    _flashcards.c.data,
+    _flashcards.c["metadata"].label("metadata_json"),
+).where(_flashcards.c.user_id == bindparam("user_id"))
+# Same rows with the metadata left as its stored JSON text.
+_RAW_FLASHCARD_ROWS = select(
+    _flashcards.c.id,
+    _flashcards.c.deck_id,
+    _flashcards.c.card_type,
+    _flashcards.c.data,
+    type_coerce(_flashcards.c["metadata"], Text).label("metadata_json"),
+).where(_flashcards.c.user_id == bindparam("user_id"))
 
 
 class FlashcardRepository:
     def __init__(self, session: Session) -> None:
         self.session = session
 
-    def get_decks(self, user_id: int) -> List[Deck]:
-        return self.session.query(Deck).filter(Deck.user_id == user_id).all()
+    def get_deck_rows(self, user_id: int) -> List[Row]:
+        """``(id, name, description, parent_id)`` of each of the user's decks."""
+        return self.session.execute(_DECK_ROWS, {"user_id": user_id}).all()
 
     def get_deck(self, user_id: int, deck_id: int) -> Optional[Deck]:
         return (
@@ -38,6 +70,7 @@ class FlashcardRepository:
         card_type: str,
         data: bytes,
         metadata: dict | None = None,
+        fingerprint: Optional[str] = None,
     ) -> Flashcard:
         card = Flashcard(
             user_id=user_id,
@@ -45,11 +78,66 @@ class FlashcardRepository:
             card_type=card_type,
             data=data,
             metadata_json=metadata or {},
+            fingerprint=fingerprint,
         )
         self.session.add(card)
         self.session.flush()
         return card
 
+    def bulk_insert_flashcards(
+        self, rows: List[dict], *, on_conflict: str = "skip"
+    ) -> List[Tuple[int, Optional[str]]]:
+        """Insert flashcards from column dictionaries in one executemany round trip.
+
+        Rows whose ``fingerprint`` already exists for the user are skipped, or
+        overwritten when ``on_conflict`` is ``"update"``. Returns ``(id,
+        fingerprint)`` for every row that was inserted or updated.
+        """
+        if not rows:
+            return []
+        statement = sqlite_insert(Flashcard)
+        conflict_target = [Flashcard.user_id, Flashcard.fingerprint]
+        if on_conflict == "update":
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict_target,
+                set_={
+                    "deck_id": statement.excluded.deck_id,
+                    "card_type": statement.excluded.card_type,
+                    "data": statement.excluded.data,
+                    "metadata": statement.excluded["metadata"],
+                    "updated_at": dt.datetime.utcnow(),
+                },
+            )
+        elif on_conflict == "skip":
+            statement = statement.on_conflict_do_nothing(index_elements=conflict_target)
+        else:
+            raise ValueError(f"Unknown conflict policy: {on_conflict}")
+        statement = statement.returning(Flashcard.id, Flashcard.fingerprint)
+        return [(row.id, row.fingerprint) for row in self.session.execute(statement, rows)]
+
+    def existing_fingerprints(self, user_id: int, fingerprints: Iterable[str]) -> set[str]:
+        values = list(fingerprints)
+        if not values:
+            return set()
+        rows = (
+            self.session.query(Flashcard.fingerprint)
+            .filter(Flashcard.user_id == user_id, Flashcard.fingerprint.in_(values))
+            .all()
+        )
+        return {row.fingerprint for row in rows}
+
+    def get_unfingerprinted_page(
+        self, user_id: int, *, after_id: Optional[int] = None, limit: int = 500
+    ) -> List[Flashcard]:
+        query = (
+            self.session.query(Flashcard)
+            .options(undefer(Flashcard.data))
+            .filter(Flashcard.user_id == user_id, Flashcard.fingerprint.is_(None))
+        )
+        if after_id is not None:
+            query = query.filter(Flashcard.id > after_id)
+        return query.order_by(Flashcard.id).limit(limit).all()
+
     def add_review_log(
         self,
         flashcard_id: int,
@@ -72,8 +160,113 @@ class FlashcardRepository:
         self.session.flush()
         return log
 
-    def get_flashcards(self, user_id: int) -> List[Flashcard]:
-        return self.session.query(Flashcard).filter(Flashcard.user_id == user_id).all()
+    def get_review_logs(self, flashcard_id: int) -> List[ReviewLog]:
+        return (
+            self.session.query(ReviewLog)
+            .filter(ReviewLog.flashcard_id == flashcard_id)
+            .order_by(ReviewLog.id)
+            .all()
+        )
+
+    def get_card_states(self, flashcard_ids: Iterable[int]) -> Dict[int, CardState]:
+        ids = list(flashcard_ids)
+        if not ids:
+            return {}
+        states = self.session.query(CardState).filter(CardState.flashcard_id.in_(ids)).all()
+        return {state.flashcard_id: state for state in states}
+
+    def upsert_card_states(self, rows: List[dict]) -> List[CardState]:
+        """Create or update card states from column dictionaries with a single flush."""
+        existing = self.get_card_states(row["flashcard_id"] for row in rows)
+        states: List[CardState] = []
+        for row in rows:
+            state = existing.get(row["flashcard_id"])
+            if state is None:
+                state = CardState(flashcard_id=row["flashcard_id"])
+                existing[state.flashcard_id] = state
+                self.session.add(state)
+            for key, value in row.items():
+                setattr(state, key, value)
+            states.append(state)
+        self.session.flush()
+        return states
+
+    def bulk_add_review_logs(self, rows: List[dict]) -> None:
+        """Insert review logs from column dictionaries in one executemany round trip."""
+        if rows:
+            # Core table insert: skips the ORM's per-row bookkeeping for large histories.
+            self.session.execute(insert(ReviewLog.__table__), rows)
+
+    def bulk_insert_card_states(self, rows: List[dict]) -> None:
+        """Insert states for cards that have none yet, without loading ORM objects."""
+        if rows:
+            self.session.execute(insert(CardState.__table__), rows)
+
+    def get_due_flashcards(self, user_id: int, now: dt.datetime, limit: int) -> List[Flashcard]:
+        return (
+            self.session.query(Flashcard)
+            .options(undefer(Flashcard.data))
+            .join(CardState, CardState.flashcard_id == Flashcard.id)
+            .filter(CardState.user_id == user_id, CardState.due_at <= now)
+            .order_by(CardState.due_at)
+            .limit(limit)
+            .all()
+        )
+
+    def get_flashcard_rows(self, user_id: int, *, raw_metadata: bool = False) -> List[Row]:
+        """``(id, deck_id, card_type, data, metadata_json)`` of each of the user's cards.
+
+        With ``raw_metadata`` the metadata is returned as JSON text instead of
+        being parsed into a dict per row.
+        """
+        statement = _RAW_FLASHCARD_ROWS if raw_metadata else _FLASHCARD_ROWS
+        return self.session.execute(statement, {"user_id": user_id}).all()
+
+    def get_flashcard_page(
+        self,
+        user_id: int,
+        *,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        deck_id: Optional[int] = None,
+        card_type: Optional[str] = None,
+    ) -> List[Flashcard]:
+        """Return the next ``limit`` cards ordered by id, starting after ``after_id``."""
+        query = (
+            self.session.query(Flashcard)
+            .options(undefer(Flashcard.data))
+            .filter(Flashcard.user_id == user_id)
+        )
+        if after_id is not None:
+            query = query.filter(Flashcard.id > after_id)
+        if deck_id is not None:
+            query = query.filter(Flashcard.deck_id == deck_id)
+        if card_type is not None:
+            query = query.filter(Flashcard.card_type == card_type)
+        return query.order_by(Flashcard.id).limit(limit).all()
+
+    def get_flashcard_ids(self, user_id: int, flashcard_ids: Iterable[int]) -> set[int]:
+        """Return the subset of ``flashcard_ids`` owned by ``user_id``."""
+        ids = list(flashcard_ids)
+        if not ids:
+            return set()
+        rows = (
+            self.session.query(Flashcard.id)
+            .filter(Flashcard.user_id == user_id, Flashcard.id.in_(ids))
+            .all()
+        )
+        return {row.id for row in rows}
+
+    def get_flashcards_by_ids(self, user_id: int, flashcard_ids: Iterable[int]) -> List[Flashcard]:
+        ids = list(flashcard_ids)
+        if not ids:
+            return []
+        return (
+            self.session.query(Flashcard)
+            .options(undefer(Flashcard.data))
+            .filter(Flashcard.user_id == user_id, Flashcard.id.in_(ids))
+            .all()
+        )
 
     def bulk_save(self, entities: Iterable[Flashcard | ReviewLog]) -> None:
         for entity in entities:
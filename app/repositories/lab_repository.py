@@ -1,11 +1,12 @@
 """Repository for lab checklist data."""
 from __future__ import annotations
 
-from typing import List
+from typing import List, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload, undefer
 
-from ..models.entities import LabChecklist, LabTask
+from ..models.entities import Attachment, LabChecklist, LabTask
 
 
 class LabRepository:
@@ -29,5 +30,79 @@ class LabRepository:
     def get_checklist(self, checklist_id: int) -> LabChecklist | None:
         return self.session.query(LabChecklist).filter(LabChecklist.id == checklist_id).one_or_none()
 
-    def list_checklists(self, user_id: int) -> List[LabChecklist]:
-        return self.session.query(LabChecklist).filter(LabChecklist.user_id == user_id).all()
+    def get_task(self, task_id: int, *, with_notes: bool = False) -> LabTask | None:
+        query = self.session.query(LabTask).filter(LabTask.id == task_id)
+        if with_notes:
+            query = query.options(undefer(LabTask.notes))
+        return query.one_or_none()
+
+    def add_attachment(
+        self, task: LabTask, *, filename: str, content_hash: str, size: int
+    ) -> Attachment:
+        attachment = Attachment(task=task, filename=filename, content_hash=content_hash, size=size)
+        self.session.add(attachment)
+        self.session.flush()
+        return attachment
+
+    def get_attachment(self, attachment_id: int) -> Attachment | None:
+        return self.session.query(Attachment).filter(Attachment.id == attachment_id).one_or_none()
+
+    def count_attachments_with_hash(self, user_id: int, content_hash: str) -> int:
+        return (
+            self.session.query(Attachment)
+            .join(LabTask)
+            .join(LabChecklist)
+            .filter(LabChecklist.user_id == user_id, Attachment.content_hash == content_hash)
+            .count()
+        )
+
+    def get_inline_attachments(self, user_id: int, *, limit: int = 50) -> List[Attachment]:
+        """Attachments still stored inside the database, oldest first."""
+        return (
+            self.session.query(Attachment)
+            .options(undefer(Attachment.blob))
+            .join(LabTask)
+            .join(LabChecklist)
+            .filter(LabChecklist.user_id == user_id, Attachment.blob.is_not(None))
+            .order_by(Attachment.id)
+            .limit(limit)
+            .all()
+        )
+
+    def list_checklists(self, user_id: int, *, with_notes: bool = False) -> List[LabChecklist]:
+        """Checklists with their tasks and attachments loaded in three queries in total."""
+        tasks = selectinload(LabChecklist.tasks)
+        if with_notes:
+            tasks = tasks.undefer(LabTask.notes)
+        return (
+            self.session.query(LabChecklist)
+            .options(tasks.selectinload(LabTask.attachments))
+            .filter(LabChecklist.user_id == user_id)
+            .order_by(LabChecklist.id)
+            .all()
+        )
+
+    def checklist_status_counts(
+        self, user_id: int
+    ) -> List[Tuple[int, str, str | None, str | None, int, int]]:
+        """``(id, name, description, status, tasks, attachments)`` per checklist and task status.
+
+        A checklist without tasks yields a single row with a ``None`` status
+        and zero counts. Nothing encrypted is read.
+        """
+        stmt = (
+            select(
+                LabChecklist.id,
+                LabChecklist.name,
+                LabChecklist.description,
+                LabTask.status,
+                func.count(LabTask.id.distinct()),
+                func.count(Attachment.id),
+            )
+            .outerjoin(LabTask, LabTask.checklist_id == LabChecklist.id)
+            .outerjoin(Attachment, Attachment.task_id == LabTask.id)
+            .where(LabChecklist.user_id == user_id)
+            .group_by(LabChecklist.id, LabTask.status)
+            .order_by(LabChecklist.id)
+        )
+        return [tuple(row) for row in self.session.execute(stmt)]
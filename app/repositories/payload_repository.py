@@ -0,0 +1,58 @@
+"""Bulk access to encrypted columns, independent of the entity they belong to."""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Table, bindparam, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..crypto import LEGACY_TOKEN_PREFIX
+
+
+class PayloadRepository:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def get_legacy_page(
+        self,
+        table: Table,
+        column: str,
+        owner: ColumnElement,
+        *,
+        after_id: Optional[int] = None,
+        limit: int = 500,
+    ) -> List[Tuple[int, bytes]]:
+        """Keyset page of ``(id, blob)`` rows whose ``column`` still holds a Fernet token."""
+        target = table.c[column]
+        statement = select(table.c.id, target).where(
+            owner, func.substr(target, 1, len(LEGACY_TOKEN_PREFIX)) == LEGACY_TOKEN_PREFIX
+        )
+        if after_id is not None:
+            statement = statement.where(table.c.id > after_id)
+        statement = statement.order_by(table.c.id).limit(limit)
+        return [(row[0], row[1]) for row in self.session.execute(statement)]
+
+    def rewrite(self, table: Table, column: str, rows: List[Tuple[int, bytes, bytes]]) -> int:
+        """Replace ``(id, old_blob, new_blob)`` rows; returns how many were rewritten.
+
+        A row is only touched while it still holds ``old_blob``, so a save
+        that lands between the read and the rewrite is never overwritten
+        with the re-encrypted stale value.
+        """
+        if not rows:
+            return 0
+        target = table.c[column]
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"), target == bindparam("old_blob"))
+            .values({column: bindparam("new_blob")})
+        )
+        result = self.session.connection().execute(
+            statement,
+            [
+                {"row_id": row_id, "old_blob": old_blob, "new_blob": new_blob}
+                for row_id, old_blob, new_blob in rows
+            ],
+        )
+        return result.rowcount
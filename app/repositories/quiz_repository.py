@@ -3,10 +3,25 @@ from __future__ import annotations
 
 from typing import List, Optional
 
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 from ..models.entities import BlueprintSection, ExamBlueprint, QuizAttempt, QuizQuestion, QuizResponse
 
+_questions = QuizQuestion.__table__
+
+# Built once so the compiled statement is reused; see flashcard_repository.
+_QUESTION_ROWS = select(
+    _questions.c.id,
+    _questions.c.question_type,
+    _questions.c.prompt,
+    _questions.c.answer,
+    _questions.c.explanation,
+    _questions.c.references,
+    _questions.c["metadata"].label("metadata_json"),
+).where(_questions.c.user_id == bindparam("user_id"))
+
 
 class QuizRepository:
     def __init__(self, session: Session) -> None:
@@ -83,5 +98,6 @@ class QuizRepository:
         self.session.flush()
         return attempt
 
-    def list_questions(self, user_id: int) -> List[QuizQuestion]:
-        return self.session.query(QuizQuestion).filter(QuizQuestion.user_id == user_id).all()
+    def list_question_rows(self, user_id: int) -> List[Row]:
+        """Question columns as plain rows, encrypted payloads included."""
+        return self.session.execute(_QUESTION_ROWS, {"user_id": user_id}).all()
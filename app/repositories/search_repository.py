@@ -0,0 +1,81 @@
+"""Repository for the blind search index."""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.orm import Session, undefer
+
+from ..models.entities import SearchToken
+
+
+class SearchRepository:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def add_tokens(self, rows: List[dict]) -> None:
+        """Insert ``user_id``/``token_hash``/``entity``/``entity_id`` rows in one executemany."""
+        if rows:
+            self.session.execute(insert(SearchToken.__table__).prefix_with("OR IGNORE"), rows)
+
+    def delete_tokens(self, entity: str, entity_ids: Iterable[int]) -> None:
+        ids = list(entity_ids)
+        if ids:
+            self.session.execute(
+                delete(SearchToken.__table__).where(
+                    SearchToken.entity == entity, SearchToken.entity_id.in_(ids)
+                )
+            )
+
+    def match(
+        self,
+        user_id: int,
+        token_hashes: Sequence[bytes],
+        *,
+        entity: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Tuple[str, int]]:
+        """Return ``(entity, entity_id)`` pairs carrying every hash in ``token_hashes``, newest first."""
+        hashes = set(token_hashes)
+        if not hashes:
+            return []
+        statement = select(SearchToken.entity, SearchToken.entity_id).where(
+            SearchToken.user_id == user_id, SearchToken.token_hash.in_(hashes)
+        )
+        if entity is not None:
+            # ``|| ''`` keeps SQLite from answering this through ix_search_tokens_entity,
+            # which would walk every user's tokens for the entity instead of the
+            # few primary-key entries matching (user_id, token_hash).
+            statement = statement.where(SearchToken.entity.concat("") == entity)
+        statement = (
+            statement.group_by(SearchToken.entity, SearchToken.entity_id)
+            .having(func.count() == len(hashes))
+            .order_by(SearchToken.entity_id.desc())
+            .limit(limit)
+        )
+        return [(row.entity, row.entity_id) for row in self.session.execute(statement)]
+
+    def get_unindexed_page(
+        self,
+        model,
+        entity: str,
+        user_id: int,
+        *,
+        column: str,
+        after_id: Optional[int] = None,
+        limit: int = 500,
+    ) -> list:
+        """Keyset page of ``model`` rows that have no search tokens yet, with ``column`` loaded.
+
+        Indexed rows always carry at least the service's marker token, so a
+        row whose text yields no words is not picked up again.
+        """
+        indexed = exists().where(SearchToken.entity == entity, SearchToken.entity_id == model.id)
+        query = (
+            self.session.query(model)
+            .options(undefer(getattr(model, column)))
+            .filter(model.user_id == user_id, ~indexed)
+        )
+        if after_id is not None:
+            query = query.filter(model.id > after_id)
+        return query.order_by(model.id).limit(limit).all()
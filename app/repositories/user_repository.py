@@ -18,18 +18,40 @@ class UserRepository:
         return self.session.query(User).filter(User.username == username).one_or_none()
 
     def create_user(
-        self, *, username: str, password_hash: str, salt: bytes, encryption_blob: bytes
+        self,
+        *,
+        username: str,
+        password_hash: str,
+        salt: bytes,
+        encryption_blob: bytes,
+        kdf_params: Optional[dict] = None,
     ) -> User:
         user = User(
             username=username,
             password_hash=password_hash,
             password_salt=salt,
             encryption_blob=encryption_blob,
+            kdf_params=kdf_params,
         )
         self.session.add(user)
         self.session.flush()
         return user
 
+    def update_credentials(
+        self,
+        user: User,
+        *,
+        password_hash: str,
+        salt: bytes,
+        encryption_blob: bytes,
+        kdf_params: Optional[dict] = None,
+    ) -> None:
+        user.password_hash = password_hash
+        user.password_salt = salt
+        user.encryption_blob = encryption_blob
+        user.kdf_params = kdf_params
+        self.session.add(user)
+
     def set_hello_enabled(self, user: User, enabled: bool) -> None:
         user.hello_enabled = enabled
         self.session.add(user)
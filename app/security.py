@@ -2,17 +2,32 @@
 from __future__ import annotations
 
 import base64
+import functools
+import hmac
+import json
+import logging
 import os
-from dataclasses import dataclass
-from typing import Tuple
+import platform
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Optional, Tuple
 
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
-from cryptography.fernet import Fernet
+from argon2.low_level import Type, hash_secret_raw
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
-from .config import security
+from .config import paths, security
+
+LOGGER = logging.getLogger(__name__)
+
+
+# ``users.password_hash`` prefix of accounts using the single-derivation key hierarchy.
+KEY_HIERARCHY_PREFIX = "kh1$"
 
 
 @dataclass
@@ -21,6 +36,49 @@ class PasswordHashResult:
     salt: bytes
 
 
+@dataclass(frozen=True)
+class KdfParams:
+    """Argon2id cost of one account's key hierarchy, stored in ``users.kdf_params``."""
+
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+
+    @classmethod
+    def default(cls) -> "KdfParams":
+        return cls(
+            time_cost=security.password_hash_time_cost,
+            memory_cost=security.password_hash_memory_cost,
+            parallelism=security.password_hash_parallelism,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "KdfParams":
+        return cls(**data) if data else cls.default()
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def is_stronger_than(self, other: "KdfParams") -> bool:
+        """True when no cost is lower than ``other``'s and at least one is higher."""
+        return self != other and (
+            self.time_cost >= other.time_cost
+            and self.memory_cost >= other.memory_cost
+            and self.parallelism >= other.parallelism
+        )
+
+
+@dataclass
+class KeyHierarchy:
+    """Stored credentials of a key-hierarchy account and the data key they protect."""
+
+    password_hash: str
+    salt: bytes
+    encryption_blob: bytes
+    data_key: bytes
+    kdf_params: KdfParams
+
+
 class Authenticator:
     """Handle password hashing and verification."""
 
@@ -58,6 +116,133 @@ def derive_encryption_key(password: str, salt: bytes) -> bytes:
     return key
 
 
+def is_legacy_credentials(password_hash: str) -> bool:
+    """True for accounts still on Argon2 verification plus a separate PBKDF2 key."""
+    return not password_hash.startswith(KEY_HIERARCHY_PREFIX)
+
+
+def _argon2id(password: bytes, salt: bytes, params: KdfParams) -> bytes:
+    return hash_secret_raw(
+        password,
+        salt,
+        time_cost=params.time_cost,
+        memory_cost=params.memory_cost,
+        parallelism=params.parallelism,
+        hash_len=security.password_hash_hash_len,
+        type=Type.ID,
+    )
+
+
+def benchmark_kdf(params: KdfParams) -> float:
+    """Seconds one key derivation with ``params`` takes on this machine."""
+    started = time.perf_counter()
+    _argon2id(b"calibration", os.urandom(security.password_hash_salt_len), params)
+    return time.perf_counter() - started
+
+
+def calibrate_kdf(target_seconds: Optional[float] = None) -> KdfParams:
+    """Pick the strongest Argon2id cost whose derivation stays near ``target_seconds``.
+
+    Memory is raised first, doubling from ``kdf_min_memory_cost`` while a
+    run stays under half the target; the remaining budget goes to extra
+    passes. The result never drops below the configured floors.
+    """
+    target = target_seconds or security.kdf_target_seconds
+    params = KdfParams(
+        time_cost=security.kdf_min_time_cost,
+        memory_cost=security.kdf_min_memory_cost,
+        parallelism=security.password_hash_parallelism,
+    )
+    elapsed = benchmark_kdf(params)
+    while elapsed * 2 <= target and params.memory_cost * 2 <= security.kdf_max_memory_cost:
+        params = replace(params, memory_cost=params.memory_cost * 2)
+        elapsed = benchmark_kdf(params)
+    per_pass = elapsed / params.time_cost
+    return replace(params, time_cost=max(security.kdf_min_time_cost, int(target / per_pass)))
+
+
+_calibration_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def host_kdf_params() -> KdfParams:
+    """Calibrated parameters for this machine, benchmarked once and remembered on disk.
+
+    The calibration is redone when the host name, CPU count or target
+    latency changes, which is what lets logins re-tune accounts as hardware
+    changes. Calibration takes a few seconds, so the UI calls this from a
+    background job.
+    """
+    with _calibration_lock:
+        return _load_or_calibrate()
+
+
+def _load_or_calibrate() -> KdfParams:
+    host = {
+        "node": platform.node(),
+        "cpus": os.cpu_count(),
+        "target": security.kdf_target_seconds,
+    }
+    try:
+        cached = json.loads(paths.kdf_calibration.read_text(encoding="utf-8"))
+        if cached.get("host") == host:
+            return KdfParams.from_dict(cached["params"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    params = calibrate_kdf()
+    LOGGER.info("Calibrated key derivation for this machine: %s", params)
+    try:
+        paths.kdf_calibration.write_text(
+            json.dumps({"host": host, "params": params.to_dict()}), encoding="utf-8"
+        )
+    except OSError:
+        LOGGER.warning("Could not save key derivation calibration", exc_info=True)
+    return params
+
+
+def _derive_verifier_and_kek(password: str, salt: bytes, params: KdfParams) -> Tuple[bytes, bytes]:
+    """Run Argon2id once and split its output into a login verifier and a key-encryption key."""
+    master = _argon2id(password.encode("utf-8"), salt, params)
+    return _expand(master, "verifier"), _expand(master, "kek")
+
+
+def _expand(master: bytes, label: str) -> bytes:
+    info = f"kakha-study-hub/{label}".encode("utf-8")
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info).derive(master)
+
+
+def wrap_data_key(password: str, data_key: bytes, params: KdfParams) -> KeyHierarchy:
+    """Protect ``data_key`` under a fresh salt; used at registration, upgrades and rehashes."""
+    salt = os.urandom(security.password_hash_salt_len)
+    verifier, kek = _derive_verifier_and_kek(password, salt, params)
+    return KeyHierarchy(
+        password_hash=KEY_HIERARCHY_PREFIX + base64.urlsafe_b64encode(verifier).decode("ascii"),
+        salt=salt,
+        encryption_blob=Fernet(base64.urlsafe_b64encode(kek)).encrypt(data_key),
+        data_key=data_key,
+        kdf_params=params,
+    )
+
+
+def create_key_hierarchy(password: str, params: KdfParams) -> KeyHierarchy:
+    """Credentials for a new user whose data key is random rather than password-derived."""
+    return wrap_data_key(password, Fernet.generate_key(), params)
+
+
+def open_key_hierarchy(
+    password: str, password_hash: str, salt: bytes, encryption_blob: bytes, params: KdfParams
+) -> Optional[bytes]:
+    """Return the data key of a key-hierarchy account, or ``None`` if the password is wrong."""
+    verifier, kek = _derive_verifier_and_kek(password, salt, params)
+    expected = base64.urlsafe_b64decode(password_hash[len(KEY_HIERARCHY_PREFIX) :])
+    if not hmac.compare_digest(verifier, expected):
+        return None
+    try:
+        return Fernet(base64.urlsafe_b64encode(kek)).decrypt(encryption_blob)
+    except InvalidToken:
+        return None
+
+
 def generate_user_keys(password: str) -> Tuple[str, bytes, bytes]:
     """Generate a password hash and encryption key materials for a new user."""
     auth = Authenticator()
@@ -80,8 +265,18 @@ def unlock_user_key(password: str, salt: bytes, encrypted_key_blob: bytes) -> by
 
 __all__ = [
     "Authenticator",
+    "KEY_HIERARCHY_PREFIX",
+    "KdfParams",
+    "KeyHierarchy",
     "PasswordHashResult",
+    "benchmark_kdf",
+    "calibrate_kdf",
+    "create_key_hierarchy",
     "derive_encryption_key",
     "generate_user_keys",
+    "host_kdf_params",
+    "is_legacy_credentials",
+    "open_key_hierarchy",
     "unlock_user_key",
+    "wrap_data_key",
 ]
@@ -0,0 +1,106 @@
+"""Serialize payload bodies before they are compressed and encrypted.
+
+Fixed-shape records (flashcard content, quiz prompts, lab notes, ...) are
+written in a compact binary layout::
+
+    0x00 | schema id | present mask | null mask | uint16 lengths | UTF-8 strings
+
+Anything else falls back to JSON. A JSON object always starts with ``{``,
+so the leading zero byte tells the two apart, and rows written before this
+codec existed keep reading as JSON.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import struct
+from typing import Dict, Tuple
+
+BINARY_MARKER = 0
+_HEADER = struct.Struct("<BBBB")
+_MAX_STRING_BYTES = 0xFFFF
+
+# Schema ids are stored on disk: never renumber or reorder the fields of an entry.
+SCHEMAS: Dict[int, Tuple[str, ...]] = {
+    1: ("front", "back", "extra", "prompt", "created"),
+    2: ("text",),
+    3: ("notes",),
+    4: ("value",),
+}
+_FIELD_SETS = {schema_id: frozenset(fields) for schema_id, fields in SCHEMAS.items()}
+
+
+def _schema_for(payload: dict):
+    keys = payload.keys()
+    for schema_id, fields in _FIELD_SETS.items():
+        if keys <= fields:
+            return schema_id
+    return None
+
+
+def dumps(payload) -> bytes:
+    """Serialize ``payload``, using a binary schema when its shape allows."""
+    if isinstance(payload, dict) and payload:
+        schema_id = _schema_for(payload)
+        if schema_id is not None:
+            encoded = _encode_record(schema_id, payload)
+            if encoded is not None:
+                return encoded
+    return json.dumps(payload).encode("utf-8")
+
+
+def loads(data: bytes):
+    if data[:1] == b"\x00":
+        return _decode_record(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def _encode_record(schema_id: int, payload: dict):
+    present = nulls = 0
+    strings = []
+    for index, field in enumerate(SCHEMAS[schema_id]):
+        if field not in payload:
+            continue
+        present |= 1 << index
+        value = payload[field]
+        if value is None:
+            nulls |= 1 << index
+        elif isinstance(value, str):
+            strings.append(value.encode("utf-8"))
+        else:
+            return None
+    lengths = [len(item) for item in strings]
+    if lengths and max(lengths) > _MAX_STRING_BYTES:
+        return None
+    header = _HEADER.pack(BINARY_MARKER, schema_id, present, nulls)
+    return header + _lengths_struct(len(strings)).pack(*lengths) + b"".join(strings)
+
+
+@functools.lru_cache(maxsize=None)
+def _lengths_struct(count: int) -> struct.Struct:
+    return struct.Struct(f"<{count}H")
+
+
+@functools.lru_cache(maxsize=1024)
+def _layout(schema_id: int, present: int, nulls: int):
+    """Field names, names holding strings and the lengths struct of one header."""
+    fields = SCHEMAS.get(schema_id)
+    if fields is None:
+        raise ValueError(f"Unknown payload schema {schema_id}")
+    names = tuple(field for index, field in enumerate(fields) if present >> index & 1)
+    strings = tuple(field for index, field in enumerate(fields) if (present & ~nulls) >> index & 1)
+    return names, strings, _lengths_struct(len(strings))
+
+
+def _decode_record(data: bytes) -> dict:
+    names, strings, lengths = _layout(data[1], data[2], data[3])
+    payload = dict.fromkeys(names)
+    offset = _HEADER.size + lengths.size
+    for field, length in zip(strings, lengths.unpack_from(data, _HEADER.size)):
+        end = offset + length
+        payload[field] = data[offset:end].decode("utf-8")
+        offset = end
+    return payload
+
+
+__all__ = ["SCHEMAS", "dumps", "loads"]
@@ -4,12 +4,12 @@ from __future__ import annotations
 import datetime as dt
 import io
 from dataclasses import dataclass
-from typing import List
+from typing import Callable, List, Optional
 
 import matplotlib
 
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
@@ -29,47 +29,67 @@ class AnalyticsService:
     def __init__(self, output_dir: str) -> None:
         self._output_dir = output_dir
 
-    def _save_plot(self, fig, name: str) -> str:
+    def _save_plot(self, fig: Figure, name: str) -> str:
         path = f"{self._output_dir}/{name}.png"
         fig.savefig(path, bbox_inches="tight")
-        plt.close(fig)
         return path
 
-    def generate_summary(self, user_id: int) -> StudySummary:
+    def generate_summary(
+        self, user_id: int, progress: Optional[Callable[[int, int], None]] = None
+    ) -> StudySummary:
+        """Render the dashboard charts.
+
+        Figures are built without pyplot's global state so this can run on
+        a worker thread. ``progress`` is called with ``(step, total)`` after
+        the data load and after each chart.
+        """
+        report = progress or (lambda done, total: None)
         with session_scope() as session:
             repo = AnalyticsRepository(session)
             study_days = repo.get_study_days(user_id)
             attempts = repo.get_recent_quiz_attempts(user_id)
-        dates = [day.date for day in study_days]
-        minutes = [day.minutes_spent for day in study_days]
-        cards = [day.cards_reviewed for day in study_days]
-
-        fig, ax = plt.subplots(figsize=(8, 2))
+            # Read everything while the session is open: committed rows are expired.
+            dates = [day.date for day in study_days]
+            minutes = [day.minutes_spent for day in study_days]
+            cards = [day.cards_reviewed for day in study_days]
+            sections = {}
+            for attempt in attempts:
+                for response in attempt.responses:
+                    metadata = (
+                        response.question.metadata_json
+                        if response.question and response.question.metadata_json
+                        else {}
+                    )
+                    section = metadata.get("section", "General")
+                    sections.setdefault(section, 0)
+                    sections[section] += 1
+            accuracy = [float(attempt.score or 0) for attempt in attempts]
+            confidence = [
+                response.confidence or 0
+                for attempt in attempts
+                for response in attempt.responses
+            ] or [0]
+        report(1, 5)
+
+        fig = Figure(figsize=(8, 2))
+        ax = fig.subplots()
         ax.bar(dates, minutes)
         ax.set_title("Study Minutes")
         ax.set_ylabel("Minutes")
         heatmap_path = self._save_plot(fig, "study_heatmap")
+        report(2, 5)
 
         retention_days = range(1, len(cards) + 1)
-        fig, ax = plt.subplots(figsize=(6, 4))
+        fig = Figure(figsize=(6, 4))
+        ax = fig.subplots()
         ax.plot(list(retention_days), cards)
         ax.set_title("Retention Curve")
         ax.set_xlabel("Day")
         ax.set_ylabel("Cards Reviewed")
         retention_path = self._save_plot(fig, "retention_curve")
+        report(3, 5)
 
-        sections = {}
-        for attempt in attempts:
-            for response in attempt.responses:
-                metadata = (
-                    response.question.metadata_json
-                    if response.question and response.question.metadata_json
-                    else {}
-                )
-                section = metadata.get("section", "General")
-                sections.setdefault(section, 0)
-                sections[section] += 1
-        fig = plt.figure(figsize=(5, 5))
+        fig = Figure(figsize=(5, 5))
         ax = fig.add_subplot(111, polar=True)
         labels = list(sections.keys()) or ["General"]
         values = list(sections.values()) or [1]
@@ -80,19 +100,16 @@ class AnalyticsService:
         ax.fill(angles, values, alpha=0.25)
         ax.set_thetagrids([a * 180 / 3.14159 for a in angles[:-1]], labels)
         radar_path = self._save_plot(fig, "domain_radar")
+        report(4, 5)
 
-        fig, ax = plt.subplots(figsize=(6, 4))
-        accuracy = [float(attempt.score or 0) for attempt in attempts]
-        confidence = [
-            response.confidence or 0
-            for attempt in attempts
-            for response in attempt.responses
-        ] or [0]
+        fig = Figure(figsize=(6, 4))
+        ax = fig.subplots()
         ax.scatter(confidence[: len(accuracy)], accuracy)
         ax.set_xlabel("Confidence")
         ax.set_ylabel("Accuracy")
         ax.set_title("Confidence vs Accuracy")
         scatter_path = self._save_plot(fig, "confidence_scatter")
+        report(5, 5)
 
         return StudySummary(
             heatmap_path=heatmap_path,
@@ -101,8 +118,13 @@ class AnalyticsService:
             confidence_scatter_path=scatter_path,
         )
 
-    def export_weekly_pdf(self, user_id: int, output_path: str) -> None:
-        summary = self.generate_summary(user_id)
+    def export_weekly_pdf(
+        self,
+        user_id: int,
+        output_path: str,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        summary = self.generate_summary(user_id, progress)
         buffer = io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=letter)
         c.setTitle("Weekly Review")
@@ -8,7 +8,17 @@ from typing import Optional
 from ..bootstrap_db import ensure_database
 from ..database import session_scope
 from ..repositories.user_repository import UserRepository
-from ..security import Authenticator, generate_user_keys, unlock_user_key
+from ..security import (
+    Authenticator,
+    KdfParams,
+    KeyHierarchy,
+    create_key_hierarchy,
+    host_kdf_params,
+    is_legacy_credentials,
+    open_key_hierarchy,
+    unlock_user_key,
+    wrap_data_key,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -31,14 +41,15 @@ class AuthService:
             repository = UserRepository(session)
             if repository.get_by_username(username):
                 raise ValueError("Username already exists")
-            password_hash, salt, encryption_blob = generate_user_keys(password)
+            keys = create_key_hierarchy(password, host_kdf_params())
             user = repository.create_user(
                 username=username,
-                password_hash=password_hash,
-                salt=salt,
-                encryption_blob=encryption_blob,
+                password_hash=keys.password_hash,
+                salt=keys.salt,
+                encryption_blob=keys.encryption_blob,
+                kdf_params=keys.kdf_params.to_dict(),
             )
-            encryption_key = unlock_user_key(password, user.password_salt, user.encryption_blob)
+            encryption_key = keys.data_key
             LOGGER.info("Created new user %s", username)
             return AuthenticatedUser(
                 id=user.id,
@@ -53,10 +64,23 @@ class AuthService:
             user = repository.get_by_username(username)
             if user is None:
                 return None
-            if not self._authenticator.verify_password(user.password_hash, user.password_salt, password):
+            if is_legacy_credentials(user.password_hash):
+                encryption_key = self._unlock_legacy(repository, user, password)
+            else:
+                params = KdfParams.from_dict(user.kdf_params)
+                encryption_key = open_key_hierarchy(
+                    password, user.password_hash, user.password_salt, user.encryption_blob, params
+                )
+                host_params = host_kdf_params()
+                # Never lower the cost an account was given on a stronger machine.
+                if encryption_key is not None and host_params.is_stronger_than(params):
+                    self._store_keys(
+                        repository, user, wrap_data_key(password, encryption_key, host_params)
+                    )
+                    LOGGER.info("Rehashed %s for this machine's key derivation cost", username)
+            if encryption_key is None:
                 LOGGER.warning("Failed login attempt for %s", username)
                 return None
-            encryption_key = unlock_user_key(password, user.password_salt, user.encryption_blob)
             return AuthenticatedUser(
                 id=user.id,
                 username=user.username,
@@ -64,6 +88,32 @@ class AuthService:
                 hello_enabled=user.hello_enabled,
             )
 
+    def _unlock_legacy(
+        self, repository: UserRepository, user, password: str
+    ) -> Optional[bytes]:
+        """Unlock an account created before the key hierarchy and move it over.
+
+        The PBKDF2-derived key keeps encrypting the user's data; it simply
+        becomes the data key wrapped by the new key-encryption key.
+        """
+        if not self._authenticator.verify_password(user.password_hash, user.password_salt, password):
+            return None
+        encryption_key = unlock_user_key(password, user.password_salt, user.encryption_blob)
+        keys = wrap_data_key(password, encryption_key, host_kdf_params())
+        self._store_keys(repository, user, keys)
+        LOGGER.info("Upgraded %s to the single-derivation key hierarchy", user.username)
+        return encryption_key
+
+    @staticmethod
+    def _store_keys(repository: UserRepository, user, keys: KeyHierarchy) -> None:
+        repository.update_credentials(
+            user,
+            password_hash=keys.password_hash,
+            salt=keys.salt,
+            encryption_blob=keys.encryption_blob,
+            kdf_params=keys.kdf_params.to_dict(),
+        )
+
     def update_windows_hello(self, username: str, enabled: bool) -> None:
         with session_scope() as session:
             repository = UserRepository(session)
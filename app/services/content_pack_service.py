@@ -6,16 +6,15 @@ import json
 import zipfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
-
-from cryptography.fernet import Fernet
+from typing import Callable, Iterable, List, Optional
 
 from ..config import paths
+from ..crypto import get_crypto_context
 from ..database import session_scope
 from ..repositories.content_pack_repository import ContentPackRepository
 
 
-@dataclass
+@dataclass(slots=True)
 class ContentPackInfo:
     id: int
     name: str
@@ -26,18 +25,26 @@ class ContentPackInfo:
 
 class ContentPackService:
     def __init__(self, encryption_key: bytes) -> None:
-        self._fernet = Fernet(encryption_key)
+        self._crypto = get_crypto_context(encryption_key)
         paths.packs_dir.mkdir(parents=True, exist_ok=True)
 
     def _checksum(self, data: bytes) -> str:
         return hashlib.sha256(data).hexdigest()
 
-    def install_pack(self, user_id: int, pack_path: Path) -> ContentPackInfo:
+    def install_pack(
+        self,
+        user_id: int,
+        pack_path: Path,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> ContentPackInfo:
+        report = progress or (lambda done, total: None)
         with zipfile.ZipFile(pack_path, "r") as zf:
             manifest_data = json.loads(zf.read("manifest.json"))
             payload = zf.read("payload.bin") if "payload.bin" in zf.namelist() else b""
+        report(1, 3)
         checksum = self._checksum(payload)
-        encrypted_manifest = self._fernet.encrypt(json.dumps(manifest_data).encode("utf-8"))
+        encrypted_manifest = self._crypto.encrypt_payload(manifest_data)
+        report(2, 3)
         with session_scope() as session:
             repo = ContentPackRepository(session)
             pack = repo.install_pack(
@@ -48,6 +55,7 @@ class ContentPackService:
                 metadata=manifest_data,
                 manifest=encrypted_manifest,
             )
+            report(3, 3)
             return ContentPackInfo(
                 id=pack.id,
                 name=pack.name,
@@ -59,27 +67,41 @@ class ContentPackService:
     def list_packs(self, user_id: int) -> List[ContentPackInfo]:
         with session_scope() as session:
             repo = ContentPackRepository(session)
-            packs = repo.list_packs(user_id)
+            packs = repo.list_pack_rows(user_id)
+            manifests = self._crypto.decrypt_payloads(
+                [pack.manifest for pack in packs], [("content_pack", pack.id) for pack in packs]
+            )
             return [
                 ContentPackInfo(
                     id=pack.id,
                     name=pack.name,
                     version=pack.version,
                     checksum=pack.checksum,
-                    metadata=json.loads(self._fernet.decrypt(pack.manifest).decode("utf-8")),
+                    metadata=manifest,
                 )
-                for pack in packs
+                for pack, manifest in zip(packs, manifests)
             ]
 
-    def export_pack(self, user_id: int, pack_id: int, destination: Path) -> Path:
+    def export_pack(
+        self,
+        user_id: int,
+        pack_id: int,
+        destination: Path,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Path:
+        report = progress or (lambda done, total: None)
         with session_scope() as session:
             repo = ContentPackRepository(session)
-            pack = next(p for p in repo.list_packs(user_id) if p.id == pack_id)
-            metadata = json.loads(self._fernet.decrypt(pack.manifest).decode("utf-8"))
+            pack = repo.get_pack(user_id, pack_id)
+            if pack is None:
+                raise ValueError("Content pack not found")
+            metadata = self._crypto.decrypt_payload(pack.manifest, ("content_pack", pack.id))
+        report(1, 2)
         payload = json.dumps(metadata.get("items", [])).encode("utf-8")
         checksum = self._checksum(payload)
         with zipfile.ZipFile(destination, "w") as zf:
             zf.writestr("manifest.json", json.dumps(metadata))
             zf.writestr("payload.bin", payload)
             zf.writestr("checksum.txt", checksum)
+        report(2, 2)
         return destination
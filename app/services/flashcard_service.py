@@ -2,17 +2,24 @@
 from __future__ import annotations
 
 import datetime as dt
+import functools
+import itertools
 import json
+from array import array
 from dataclasses import dataclass
-from typing import Iterable, List, Optional
-
-from cryptography.fernet import Fernet
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
 
+from ..crypto import get_crypto_context
 from ..database import session_scope
+from ..models.entities import CardState
 from ..repositories.flashcard_repository import FlashcardRepository
+from ..repositories.search_repository import SearchRepository
+from .search_service import SearchService, flashcard_search_text
+
+BULK_IMPORT_CHUNK_SIZE = 1000
 
 
-@dataclass
+@dataclass(slots=True)
 class FlashcardDTO:
     id: int
     deck_id: Optional[int]
@@ -21,7 +28,99 @@ class FlashcardDTO:
     metadata: dict
 
 
-@dataclass
+class LazyFlashcardDTO(FlashcardDTO):
+    """Flashcard whose encrypted content is only decrypted when first accessed."""
+
+    __slots__ = ("_data", "_decrypt", "_content")
+
+    def __init__(
+        self,
+        *,
+        id: int,
+        deck_id: Optional[int],
+        card_type: str,
+        metadata: dict,
+        data: bytes,
+        decrypt: Callable[[bytes], dict],
+    ) -> None:
+        self.id = id
+        self.deck_id = deck_id
+        self.card_type = card_type
+        self.metadata = metadata
+        self._data = data
+        self._decrypt = decrypt
+        self._content: Optional[dict] = None
+
+    @property
+    def content(self) -> dict:
+        if self._content is None:
+            self._content = self._decrypt(self._data)
+        return self._content
+
+
+class FlashcardColumns(Sequence[FlashcardDTO]):
+    """Read-only, column-oriented collection of cards for large result sets.
+
+    Ids and deck ids live in ``array('q')`` columns (deck id 0 stands for no
+    deck) and card types as small codes into a shared list of names.
+    Metadata is kept as its stored JSON text, shared between cards with the
+    same metadata, and content stays encrypted. Indexing builds a
+    :class:`LazyFlashcardDTO` on demand, so neither is parsed or decrypted
+    until a card is actually looked at.
+    """
+
+    __slots__ = ("ids", "deck_ids", "_type_codes", "_card_types", "_data", "_metadata", "_decrypt")
+
+    def __init__(self, rows: Iterable, decrypt: Callable[[bytes, int], dict]) -> None:
+        self.ids = array("q")
+        self.deck_ids = array("q")
+        self._type_codes = array("H")
+        self._card_types: List[str] = []
+        self._data: List[bytes] = []
+        self._metadata: List[Optional[str]] = []
+        self._decrypt = decrypt
+        type_codes: Dict[str, int] = {}
+        shared: Dict[str, str] = {}
+        for card_id, deck_id, card_type, data, metadata in rows:
+            code = type_codes.get(card_type)
+            if code is None:
+                code = type_codes[card_type] = len(self._card_types)
+                self._card_types.append(card_type)
+            self.ids.append(card_id)
+            self.deck_ids.append(deck_id or 0)
+            self._type_codes.append(code)
+            self._data.append(data)
+            self._metadata.append(None if metadata is None else shared.setdefault(metadata, metadata))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        card_id = self.ids[index]
+        return LazyFlashcardDTO(
+            id=card_id,
+            deck_id=self.deck_ids[index] or None,
+            card_type=self.card_type(index),
+            metadata=self.metadata(index),
+            data=self._data[index],
+            decrypt=functools.partial(self._decrypt, card_id=card_id),
+        )
+
+    def card_type(self, index: int) -> str:
+        return self._card_types[self._type_codes[index]]
+
+    def metadata(self, index: int) -> Optional[dict]:
+        """A freshly parsed copy of the card's metadata."""
+        text = self._metadata[index]
+        return None if text is None else json.loads(text)
+
+    def content(self, index: int) -> dict:
+        return self._decrypt(self._data[index], card_id=self.ids[index])
+
+
+@dataclass(slots=True)
 class ReviewOutcome:
     flashcard_id: int
     rating: int
@@ -30,6 +129,24 @@ class ReviewOutcome:
     ease_factor: float
 
 
+@dataclass(slots=True)
+class _CardProgress:
+    """Latest scheduling outcome of a card plus its repetition and lapse counters."""
+
+    last: Optional[ReviewOutcome] = None
+    repetitions: int = 0
+    lapses: int = 0
+
+    def history(self) -> List[ReviewOutcome]:
+        return [self.last] if self.last is not None else []
+
+    def advance(self, outcome: ReviewOutcome) -> "_CardProgress":
+        if outcome.rating >= 3:
+            return _CardProgress(outcome, self.repetitions + 1, self.lapses)
+        lapses = self.lapses + 1 if self.repetitions else self.lapses
+        return _CardProgress(outcome, 0, lapses)
+
+
 class SM2Scheduler:
     """Simple implementation of the SM-2 spaced repetition algorithm."""
 
@@ -59,15 +176,39 @@ class SM2Scheduler:
         )
 
 
+def _normalize(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
 class FlashcardService:
     def __init__(self, encryption_key: bytes) -> None:
-        self._fernet = Fernet(encryption_key)
+        self._crypto = get_crypto_context(encryption_key)
+        self._search = SearchService(encryption_key)
 
     def _encrypt_payload(self, payload: dict) -> bytes:
-        return self._fernet.encrypt(json.dumps(payload).encode("utf-8"))
+        return self._crypto.encrypt_payload(payload)
+
+    def _decrypt_payload(self, blob: bytes, card_id: Optional[int] = None) -> dict:
+        cache_key = ("flashcard", card_id) if card_id is not None else None
+        return self._crypto.decrypt_payload(blob, cache_key)
 
-    def _decrypt_payload(self, blob: bytes) -> dict:
-        return json.loads(self._fernet.decrypt(blob).decode("utf-8"))
+    def _fingerprint(self, content: dict) -> str:
+        """Keyed HMAC of the card's normalized front and back.
+
+        Cards with neither (prompt- or extra-only cards) are fingerprinted on
+        their remaining fields instead, so they are not all taken for one
+        duplicate. Normalizing drops ``\x1f``, so the two forms never collide.
+        """
+        parts = [_normalize(content.get(field)) for field in ("front", "back")]
+        if not any(parts):
+            parts += [_normalize(content.get(field)) for field in ("extra", "prompt")]
+        normalized = "\x1f".join(parts)
+        return self._crypto.keyed_hash("flashcard-fingerprint", normalized.encode("utf-8")).hex()
+
+    def _decrypt_payloads(self, cards) -> List[dict]:
+        return self._crypto.decrypt_payloads(
+            [card.data for card in cards], [("flashcard", card.id) for card in cards]
+        )
 
     def create_deck(self, user_id: int, name: str, description: str = "", parent_id: Optional[int] = None) -> None:
         with session_scope() as session:
@@ -78,7 +219,7 @@ class FlashcardService:
     def list_decks(self, user_id: int) -> List[dict]:
         with session_scope() as session:
             repo = FlashcardRepository(session)
-            decks = repo.get_decks(user_id)
+            decks = repo.get_deck_rows(user_id)
             return [
                 {
                     "id": deck.id,
@@ -98,8 +239,11 @@ class FlashcardService:
         content: dict,
         metadata: Optional[dict] = None,
     ) -> FlashcardDTO:
+        fingerprint = self._fingerprint(content)
         with session_scope() as session:
             repo = FlashcardRepository(session)
+            if repo.existing_fingerprints(user_id, [fingerprint]):
+                raise ValueError("An identical flashcard already exists")
             encrypted = self._encrypt_payload(content)
             card = repo.create_flashcard(
                 user_id=user_id,
@@ -107,6 +251,15 @@ class FlashcardService:
                 card_type=card_type,
                 data=encrypted,
                 metadata=metadata,
+                fingerprint=fingerprint,
+            )
+            SearchRepository(session).add_tokens(
+                self._search.token_rows(
+                    user_id=user_id,
+                    entity="flashcard",
+                    entity_id=card.id,
+                    texts=flashcard_search_text(content),
+                )
             )
             return FlashcardDTO(
                 id=card.id,
@@ -116,38 +269,117 @@ class FlashcardService:
                 metadata=card.metadata_json,
             )
 
+    def _to_dtos(self, cards) -> List[FlashcardDTO]:
+        contents = self._decrypt_payloads(cards)
+        return [
+            FlashcardDTO(
+                id=card.id,
+                deck_id=card.deck_id,
+                card_type=card.card_type,
+                content=content,
+                metadata=card.metadata_json,
+            )
+            for card, content in zip(cards, contents)
+        ]
+
     def list_flashcards(self, user_id: int) -> List[FlashcardDTO]:
         with session_scope() as session:
             repo = FlashcardRepository(session)
-            cards = repo.get_flashcards(user_id)
-            results: List[FlashcardDTO] = []
-            for card in cards:
-                results.append(
-                    FlashcardDTO(
-                        id=card.id,
-                        deck_id=card.deck_id,
-                        card_type=card.card_type,
-                        content=self._decrypt_payload(card.data),
-                        metadata=card.metadata_json,
-                    )
-                )
-            return results
+            return self._to_dtos(repo.get_flashcard_rows(user_id))
 
-    def schedule_review(
+    def list_flashcard_columns(self, user_id: int) -> FlashcardColumns:
+        """All of the user's cards as a compact :class:`FlashcardColumns`, decrypted on access."""
+        with session_scope() as session:
+            repo = FlashcardRepository(session)
+            rows = repo.get_flashcard_rows(user_id, raw_metadata=True)
+        return FlashcardColumns(rows, self._decrypt_payload)
+
+    def get_flashcards(self, user_id: int, flashcard_ids: Sequence[int]) -> List[FlashcardDTO]:
+        """Return the user's cards among ``flashcard_ids``, in the order given."""
+        with session_scope() as session:
+            repo = FlashcardRepository(session)
+            cards = repo.get_flashcards_by_ids(user_id, flashcard_ids)
+            by_id = {dto.id: dto for dto in self._to_dtos(cards)}
+        return [by_id[card_id] for card_id in flashcard_ids if card_id in by_id]
+
+    def search_flashcards(self, user_id: int, query: str, *, limit: int = 50) -> List[FlashcardDTO]:
+        """Cards matching ``query`` through the blind index; see :class:`SearchService`."""
+        hits = self._search.search(user_id, query, entity="flashcard", limit=limit)
+        return self.get_flashcards(user_id, [hit.entity_id for hit in hits])
+
+    def get_flashcard_page(
         self,
+        user_id: int,
         *,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        deck_id: Optional[int] = None,
+        card_type: Optional[str] = None,
+    ) -> List[FlashcardDTO]:
+        """Return one keyset page of cards; content is decrypted lazily per card."""
+        with session_scope() as session:
+            repo = FlashcardRepository(session)
+            cards = repo.get_flashcard_page(
+                user_id, after_id=after_id, limit=limit, deck_id=deck_id, card_type=card_type
+            )
+            return [
+                LazyFlashcardDTO(
+                    id=card.id,
+                    deck_id=card.deck_id,
+                    card_type=card.card_type,
+                    metadata=card.metadata_json,
+                    data=card.data,
+                    decrypt=functools.partial(self._decrypt_payload, card_id=card.id),
+                )
+                for card in cards
+            ]
+
+    def iter_flashcard_pages(
+        self,
         user_id: int,
-        flashcard_id: int,
-        rating: int,
-        scheduler: SM2Scheduler | None = None,
-    ) -> ReviewOutcome:
-        scheduler = scheduler or SM2Scheduler()
+        *,
+        page_size: int = 100,
+        deck_id: Optional[int] = None,
+        card_type: Optional[str] = None,
+    ) -> Iterator[List[FlashcardDTO]]:
+        """Yield successive pages of ``page_size`` cards in id order."""
+        after_id: Optional[int] = None
+        while True:
+            page = self.get_flashcard_page(
+                user_id, after_id=after_id, limit=page_size, deck_id=deck_id, card_type=card_type
+            )
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    def due_cards(self, user_id: int, limit: int = 50) -> List[FlashcardDTO]:
+        """Return up to ``limit`` reviewed cards whose next review is due, oldest first."""
         with session_scope() as session:
             repo = FlashcardRepository(session)
-            card = next(
-                card for card in repo.get_flashcards(user_id) if card.id == flashcard_id
+            cards = repo.get_due_flashcards(user_id, dt.datetime.utcnow(), limit)
+            return self._to_dtos(cards)
+
+    def _load_state(
+        self, repo: FlashcardRepository, flashcard_id: int, state: Optional[CardState]
+    ) -> _CardProgress:
+        if state is not None:
+            return _CardProgress(
+                last=ReviewOutcome(
+                    flashcard_id=flashcard_id,
+                    rating=0,
+                    scheduled_at=state.due_at,
+                    interval=state.interval,
+                    ease_factor=float(state.ease_factor),
+                ),
+                repetitions=state.repetitions,
+                lapses=state.lapses,
             )
-            reviews = [
+        # Cards reviewed before the state table existed: replay their logs once.
+        progress = _CardProgress()
+        for log in repo.get_review_logs(flashcard_id):
+            progress = progress.advance(
                 ReviewOutcome(
                     flashcard_id=log.flashcard_id,
                     rating=log.rating or 0,
@@ -155,42 +387,227 @@ class FlashcardService:
                     interval=log.interval or 0,
                     ease_factor=float(log.ease_factor or 2.5),
                 )
-                for log in card.reviews
-            ]
-            outcome = scheduler.schedule(flashcard_id, reviews, rating)
-            repo.add_review_log(
-                flashcard_id=flashcard_id,
-                scheduled_at=outcome.scheduled_at,
-                reviewed_at=dt.datetime.utcnow(),
-                rating=rating,
-                interval=outcome.interval,
-                ease_factor=outcome.ease_factor,
             )
-            return outcome
+        return progress
 
-    def bulk_import(
+    def schedule_review(
         self,
         *,
         user_id: int,
-        cards: Iterable[dict],
-    ) -> int:
+        flashcard_id: int,
+        rating: int,
+        scheduler: SM2Scheduler | None = None,
+    ) -> ReviewOutcome:
+        return self.schedule_reviews_batch(
+            user_id=user_id, reviews=[(flashcard_id, rating)], scheduler=scheduler
+        )[0]
+
+    def schedule_reviews_batch(
+        self,
+        *,
+        user_id: int,
+        reviews: Sequence[tuple[int, int]],
+        scheduler: SM2Scheduler | None = None,
+    ) -> List[ReviewOutcome]:
+        """Grade a review session of ``(flashcard_id, rating)`` pairs in one transaction."""
+        scheduler = scheduler or SM2Scheduler()
         with session_scope() as session:
             repo = FlashcardRepository(session)
-            count = 0
-            for card in cards:
-                payload = {
+            card_ids = {flashcard_id for flashcard_id, _ in reviews}
+            missing = card_ids - repo.get_flashcard_ids(user_id, card_ids)
+            if missing:
+                raise ValueError(f"Flashcard not found: {min(missing)}")
+            states = repo.get_card_states(card_ids)
+            progress: dict[int, _CardProgress] = {}
+            outcomes: List[ReviewOutcome] = []
+            logs: List[dict] = []
+            reviewed_at = dt.datetime.utcnow()
+            for flashcard_id, rating in reviews:
+                if flashcard_id not in progress:
+                    progress[flashcard_id] = self._load_state(
+                        repo, flashcard_id, states.get(flashcard_id)
+                    )
+                current = progress[flashcard_id]
+                outcome = scheduler.schedule(flashcard_id, current.history(), rating)
+                progress[flashcard_id] = current.advance(outcome)
+                outcomes.append(outcome)
+                logs.append(
+                    {
+                        "flashcard_id": flashcard_id,
+                        "scheduled_at": outcome.scheduled_at,
+                        "reviewed_at": reviewed_at,
+                        "rating": rating,
+                        "interval": outcome.interval,
+                        "ease_factor": outcome.ease_factor,
+                    }
+                )
+            repo.bulk_add_review_logs(logs)
+            repo.upsert_card_states(
+                [
+                    {
+                        "flashcard_id": flashcard_id,
+                        "user_id": user_id,
+                        "due_at": item.last.scheduled_at,
+                        "interval": item.last.interval,
+                        "ease_factor": item.last.ease_factor,
+                        "repetitions": item.repetitions,
+                        "lapses": item.lapses,
+                        "last_reviewed_at": reviewed_at,
+                    }
+                    for flashcard_id, item in progress.items()
+                ]
+            )
+            return outcomes
+
+    def iter_bulk_import(
+        self,
+        *,
+        user_id: int,
+        cards: Iterable[dict],
+        chunk_size: int = BULK_IMPORT_CHUNK_SIZE,
+        on_duplicate: str = "skip",
+    ) -> Iterator[int]:
+        """Import ``cards`` in committed chunks, yielding the running total after each one."""
+        total = 0
+        iterator = iter(cards)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            payloads = [
+                {
                     "front": card.get("front"),
                     "back": card.get("back"),
                     "extra": card.get("extra"),
                     "prompt": card.get("prompt"),
                 }
-                encrypted = self._encrypt_payload(payload)
-                repo.create_flashcard(
-                    user_id=user_id,
-                    deck_id=card.get("deck_id"),
-                    card_type=card.get("card_type", "basic"),
-                    data=encrypted,
-                    metadata=card.get("metadata") or {},
+                for card in chunk
+            ]
+            fingerprints = [self._fingerprint(payload) for payload in payloads]
+            encrypted = self._crypto.encrypt_payloads(payloads)
+            rows = [
+                {
+                    "user_id": user_id,
+                    "deck_id": card.get("deck_id"),
+                    "card_type": card.get("card_type", "basic"),
+                    "data": data,
+                    "metadata_json": card.get("metadata") or {},
+                    "fingerprint": fingerprint,
+                }
+                for card, data, fingerprint in zip(chunk, encrypted, fingerprints)
+            ]
+            with session_scope() as session:
+                repo = FlashcardRepository(session)
+                existing = repo.existing_fingerprints(user_id, fingerprints)
+                stored = {
+                    fingerprint: card_id
+                    for card_id, fingerprint in repo.bulk_insert_flashcards(
+                        rows, on_conflict=on_duplicate
+                    )
+                }
+                updated = [stored[fp] for fp in existing if fp in stored]
+                for card_id in updated:
+                    self._crypto.forget("flashcard", card_id)
+                # Later rows overwrite earlier duplicates on update and are dropped on skip.
+                texts: Dict[str, List[str]] = {}
+                for fingerprint, payload in zip(fingerprints, payloads):
+                    if on_duplicate == "update" or fingerprint not in texts:
+                        texts[fingerprint] = flashcard_search_text(payload)
+                search_repo = SearchRepository(session)
+                search_repo.delete_tokens("flashcard", updated)
+                search_repo.add_tokens(
+                    [
+                        row
+                        for fingerprint, card_id in stored.items()
+                        for row in self._search.token_rows(
+                            user_id=user_id,
+                            entity="flashcard",
+                            entity_id=card_id,
+                            texts=texts[fingerprint],
+                        )
+                    ]
+                )
+                # History only accompanies cards created by this chunk.
+                created = [
+                    (card, stored.pop(fingerprint))
+                    for card, fingerprint in zip(chunk, fingerprints)
+                    if fingerprint not in existing and fingerprint in stored
+                ]
+                repo.bulk_add_review_logs(
+                    [
+                        dict(log, flashcard_id=card_id)
+                        for card, card_id in created
+                        for log in card.get("history") or ()
+                    ]
+                )
+                repo.bulk_insert_card_states(
+                    [
+                        dict(card["state"], flashcard_id=card_id, user_id=user_id)
+                        for card, card_id in created
+                        if card.get("state")
+                    ]
                 )
-                count += 1
-            return count
+            total += len(created) + len(stored)
+            yield total
+
+    def bulk_import(
+        self,
+        *,
+        user_id: int,
+        cards: Iterable[dict],
+        chunk_size: int = BULK_IMPORT_CHUNK_SIZE,
+        on_duplicate: str = "skip",
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Import ``cards`` and return how many were created or updated.
+
+        Cards whose normalized front and back match an existing card are
+        detected through the fingerprint index and skipped, or overwritten
+        when ``on_duplicate`` is ``"update"``. A card may carry a ``history``
+        list of review-log columns and a ``state`` dict of card-state
+        columns, as produced by the Anki importer; both are bulk-inserted
+        alongside newly created cards. Each chunk of ``chunk_size`` cards is
+        committed on its own, so an interrupted import keeps the chunks that
+        completed. ``progress`` is called with the running total after every
+        chunk.
+        """
+        count = 0
+        for count in self.iter_bulk_import(
+            user_id=user_id, cards=cards, chunk_size=chunk_size, on_duplicate=on_duplicate
+        ):
+            if progress is not None:
+                progress(count)
+        return count
+
+    def backfill_fingerprints(
+        self,
+        user_id: int,
+        *,
+        batch_size: int = 500,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Fingerprint cards created before duplicate detection existed.
+
+        Cards that duplicate an already fingerprinted card keep a NULL
+        fingerprint. Returns how many cards were fingerprinted.
+        """
+        updated = 0
+        after_id: Optional[int] = None
+        while True:
+            with session_scope() as session:
+                repo = FlashcardRepository(session)
+                cards = repo.get_unfingerprinted_page(user_id, after_id=after_id, limit=batch_size)
+                if not cards:
+                    return updated
+                fingerprints = [
+                    self._fingerprint(content) for content in self._decrypt_payloads(cards)
+                ]
+                taken = repo.existing_fingerprints(user_id, fingerprints)
+                for card, fingerprint in zip(cards, fingerprints):
+                    if fingerprint not in taken:
+                        card.fingerprint = fingerprint
+                        taken.add(fingerprint)
+                        updated += 1
+                after_id = cards[-1].id
+            if progress is not None:
+                progress(updated)
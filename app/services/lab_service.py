@@ -1,25 +1,36 @@
 """Manage lab checklists and attachments."""
 from __future__ import annotations
 
-import base64
-import json
-from typing import List
-
-from cryptography.fernet import Fernet
+import io
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Dict, List, Optional
 
+from ..attachment_store import AttachmentStore
+from ..crypto import get_crypto_context
 from ..database import session_scope
 from ..repositories.lab_repository import LabRepository
 
 
+@dataclass
+class LabChecklistSummary:
+    id: int
+    name: str
+    description: Optional[str]
+    task_count: int = 0
+    attachment_count: int = 0
+    status_counts: Dict[str, int] = field(default_factory=dict)
+
+
 class LabService:
     def __init__(self, encryption_key: bytes) -> None:
-        self._fernet = Fernet(encryption_key)
+        self._crypto = get_crypto_context(encryption_key)
+        self._store = AttachmentStore(encryption_key)
 
     def _encrypt(self, payload: dict) -> bytes:
-        return self._fernet.encrypt(json.dumps(payload).encode("utf-8"))
+        return self._crypto.encrypt_payload(payload)
 
-    def _decrypt(self, blob: bytes) -> dict:
-        return json.loads(self._fernet.decrypt(blob).decode("utf-8"))
+    def _decrypt(self, blob: bytes, task_id: int) -> dict:
+        return self._crypto.decrypt_payload(blob, ("lab_task", task_id))
 
     def create_checklist(self, user_id: int, name: str, description: str) -> int:
         with session_scope() as session:
@@ -36,10 +47,114 @@ class LabService:
             task = repo.add_task(checklist, name, status, self._encrypt({"notes": notes}))
             return task.id
 
-    def list_checklists(self, user_id: int) -> List[dict]:
+    def add_attachment(self, task_id: int, filename: str, source: BinaryIO) -> int:
+        """Stream ``source`` into the attachment store and record it against the task."""
+        with session_scope() as session:
+            repo = LabRepository(session)
+            task = repo.get_task(task_id)
+            if task is None:
+                raise ValueError("Task not found")
+            content_hash, size = self._store.put(task.checklist.user_id, source)
+            attachment = repo.add_attachment(
+                task, filename=filename, content_hash=content_hash, size=size
+            )
+            return attachment.id
+
+    def open_attachment(self, attachment_id: int) -> BinaryIO:
+        """Seekable reader over an attachment; close it when done."""
+        with session_scope() as session:
+            attachment = LabRepository(session).get_attachment(attachment_id)
+            if attachment is None:
+                raise ValueError("Attachment not found")
+            if attachment.content_hash is None:
+                return io.BytesIO(attachment.blob)
+            user_id = attachment.task.checklist.user_id
+            content_hash = attachment.content_hash
+        return self._store.open(user_id, content_hash)
+
+    def remove_attachment(self, attachment_id: int) -> None:
+        """Delete an attachment, and its stored file once no other task refers to it."""
         with session_scope() as session:
             repo = LabRepository(session)
-            checklists = repo.list_checklists(user_id)
+            attachment = repo.get_attachment(attachment_id)
+            if attachment is None:
+                return
+            user_id = attachment.task.checklist.user_id
+            content_hash = attachment.content_hash
+            session.delete(attachment)
+            session.flush()
+            orphaned = content_hash is not None and not repo.count_attachments_with_hash(
+                user_id, content_hash
+            )
+        if orphaned:
+            self._store.delete(user_id, content_hash)
+
+    def migrate_inline_attachments(
+        self,
+        user_id: int,
+        *,
+        batch_size: int = 50,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Move attachments stored inside the database into the attachment store."""
+        moved = 0
+        while True:
+            with session_scope() as session:
+                repo = LabRepository(session)
+                attachments = repo.get_inline_attachments(user_id, limit=batch_size)
+                if not attachments:
+                    return moved
+                for attachment in attachments:
+                    attachment.content_hash, attachment.size = self._store.put(
+                        user_id, io.BytesIO(attachment.blob)
+                    )
+                    attachment.blob = None
+                moved += len(attachments)
+            if progress is not None:
+                progress(moved)
+
+    def checklist_summaries(self, user_id: int) -> List[LabChecklistSummary]:
+        """Task and attachment counts per checklist from one aggregate query, without decrypting."""
+        with session_scope() as session:
+            rows = LabRepository(session).checklist_status_counts(user_id)
+        summaries: Dict[int, LabChecklistSummary] = {}
+        for checklist_id, name, description, status, tasks, attachments in rows:
+            summary = summaries.get(checklist_id)
+            if summary is None:
+                summary = summaries[checklist_id] = LabChecklistSummary(
+                    checklist_id, name, description
+                )
+            if tasks:
+                summary.task_count += tasks
+                summary.attachment_count += attachments
+                summary.status_counts[status] = tasks
+        return list(summaries.values())
+
+    def get_task_notes(self, task_id: int) -> str:
+        with session_scope() as session:
+            task = LabRepository(session).get_task(task_id, with_notes=True)
+            if task is None:
+                raise ValueError("Task not found")
+            return self._decrypt(task.notes, task.id)["notes"] if task.notes else ""
+
+    def list_checklists(self, user_id: int, *, include_notes: bool = False) -> List[dict]:
+        """Checklists with their tasks and attachments.
+
+        Notes are only decrypted with ``include_notes``; otherwise each task's
+        ``notes`` is ``None`` and :meth:`get_task_notes` fetches it on demand.
+        """
+        with session_scope() as session:
+            checklists = LabRepository(session).list_checklists(user_id, with_notes=include_notes)
+            notes: Dict[int, str] = {}
+            if include_notes:
+                encrypted = [
+                    task for checklist in checklists for task in checklist.tasks if task.notes
+                ]
+                payloads = self._crypto.decrypt_payloads(
+                    (task.notes for task in encrypted),
+                    [("lab_task", task.id) for task in encrypted],
+                )
+                notes = {task.id: payload["notes"] for task, payload in zip(encrypted, payloads)}
             return [
                 {
                     "id": checklist.id,
@@ -50,12 +165,12 @@ class LabService:
                             "id": task.id,
                             "name": task.name,
                             "status": task.status,
-                            "notes": self._decrypt(task.notes or self._encrypt({"notes": ""}))["notes"],
+                            "notes": notes.get(task.id, "") if include_notes else None,
                             "attachments": [
                                 {
                                     "id": attachment.id,
                                     "filename": attachment.filename,
-                                    "blob": base64.b64encode(attachment.blob).decode("utf-8"),
+                                    "size": attachment.size,
                                 }
                                 for attachment in task.attachments
                             ],
@@ -0,0 +1,114 @@
+"""Convert rows still encrypted as Fernet tokens to the AES-GCM envelope."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import Table, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..crypto import get_crypto_context
+from ..database import session_scope
+from ..models.entities import (
+    ContentPack,
+    Flashcard,
+    LabChecklist,
+    LabTask,
+    QuizAttempt,
+    QuizQuestion,
+    QuizResponse,
+)
+from ..repositories.payload_repository import PayloadRepository
+
+
+@dataclass(frozen=True)
+class EncryptedColumn:
+    table: Table
+    column: str
+    owner: Callable[[int], ColumnElement]
+    # Entity name the payload cache files this column under, if it is cached.
+    cache_entity: Optional[str] = None
+
+
+def _owned_by(model) -> Callable[[int], ColumnElement]:
+    return lambda user_id: model.__table__.c.user_id == user_id
+
+
+ENCRYPTED_COLUMNS = (
+    EncryptedColumn(Flashcard.__table__, "data", _owned_by(Flashcard), "flashcard"),
+    EncryptedColumn(QuizQuestion.__table__, "prompt", _owned_by(QuizQuestion), "quiz_prompt"),
+    EncryptedColumn(QuizQuestion.__table__, "answer", _owned_by(QuizQuestion), "quiz_answer"),
+    EncryptedColumn(
+        QuizQuestion.__table__, "explanation", _owned_by(QuizQuestion), "quiz_explanation"
+    ),
+    EncryptedColumn(
+        QuizResponse.__table__,
+        "user_answer",
+        lambda user_id: QuizResponse.attempt_id.in_(
+            select(QuizAttempt.id).where(QuizAttempt.user_id == user_id)
+        ),
+    ),
+    EncryptedColumn(
+        LabTask.__table__,
+        "notes",
+        lambda user_id: LabTask.checklist_id.in_(
+            select(LabChecklist.id).where(LabChecklist.user_id == user_id)
+        ),
+        "lab_task",
+    ),
+    EncryptedColumn(ContentPack.__table__, "manifest", _owned_by(ContentPack), "content_pack"),
+)
+
+
+class PayloadMigrationService:
+    """Re-encrypt a user's legacy Fernet tokens in committed batches.
+
+    Plaintext is never parsed: each token is decrypted and sealed again as
+    raw bytes, so the migrator is safe to run alongside normal use and to
+    interrupt; rows already converted are simply not selected again, and a
+    row saved after its page was read keeps the newer value.
+    """
+
+    def __init__(self, encryption_key: bytes) -> None:
+        self._crypto = get_crypto_context(encryption_key)
+
+    def migrate(
+        self,
+        user_id: int,
+        *,
+        batch_size: int = 500,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Convert every legacy payload of ``user_id``; returns how many rows were rewritten."""
+        migrated = 0
+        for spec in ENCRYPTED_COLUMNS:
+            after_id: Optional[int] = None
+            while True:
+                with session_scope() as session:
+                    repo = PayloadRepository(session)
+                    rows = repo.get_legacy_page(
+                        spec.table,
+                        spec.column,
+                        spec.owner(user_id),
+                        after_id=after_id,
+                        limit=batch_size,
+                    )
+                    if not rows:
+                        break
+                    ids = [row_id for row_id, _ in rows]
+                    blobs = self._crypto.reencrypt_many(blob for _, blob in rows)
+                    migrated += repo.rewrite(
+                        spec.table,
+                        spec.column,
+                        [(row_id, old, new) for (row_id, old), new in zip(rows, blobs)],
+                    )
+                    after_id = ids[-1]
+                if spec.cache_entity is not None:
+                    for row_id in ids:
+                        self._crypto.forget(spec.cache_entity, row_id)
+                if progress is not None:
+                    progress(migrated)
+        return migrated
+
+
+__all__ = ["ENCRYPTED_COLUMNS", "EncryptedColumn", "PayloadMigrationService"]
@@ -1,18 +1,18 @@
 """Quiz generation and grading services."""
 from __future__ import annotations
 
-import json
 import random
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Optional
 
-from cryptography.fernet import Fernet
-
+from ..crypto import get_crypto_context
 from ..database import session_scope
 from ..repositories.quiz_repository import QuizRepository
+from ..repositories.search_repository import SearchRepository
+from .search_service import SearchService, question_search_text
 
 
-@dataclass
+@dataclass(slots=True)
 class QuizQuestionDTO:
     id: int
     question_type: str
@@ -32,13 +32,18 @@ class QuizAttemptResult:
 
 class QuizService:
     def __init__(self, encryption_key: bytes) -> None:
-        self._fernet = Fernet(encryption_key)
+        self._crypto = get_crypto_context(encryption_key)
+        self._search = SearchService(encryption_key)
 
     def _encrypt(self, payload: dict) -> bytes:
-        return self._fernet.encrypt(json.dumps(payload).encode("utf-8"))
+        return self._crypto.encrypt_payload(payload)
 
-    def _decrypt(self, blob: bytes) -> dict:
-        return json.loads(self._fernet.decrypt(blob).decode("utf-8"))
+    def _decrypt_column(self, questions, column: str) -> List[dict]:
+        """Batch-decrypt one encrypted column of ``questions`` through the payload cache."""
+        return self._crypto.decrypt_payloads(
+            [getattr(q, column) for q in questions],
+            [(f"quiz_{column}", q.id) for q in questions],
+        )
 
     def add_blueprint(
         self,
@@ -82,22 +87,36 @@ class QuizService:
                 references=references,
                 metadata=metadata,
             )
+            SearchRepository(session).add_tokens(
+                self._search.token_rows(
+                    user_id=user_id,
+                    entity="quiz_question",
+                    entity_id=question.id,
+                    texts=question_search_text(prompt),
+                )
+            )
             return question.id
 
     def list_questions(self, user_id: int) -> List[QuizQuestionDTO]:
         with session_scope() as session:
             repo = QuizRepository(session)
+            questions = repo.list_question_rows(user_id)
+            prompts = self._decrypt_column(questions, "prompt")
+            answers = self._decrypt_column(questions, "answer")
+            explanations = iter(
+                self._decrypt_column([q for q in questions if q.explanation], "explanation")
+            )
             return [
                 QuizQuestionDTO(
                     id=q.id,
                     question_type=q.question_type,
-                    prompt=self._decrypt(q.prompt),
-                    answer=self._decrypt(q.answer),
-                    explanation=self._decrypt(q.explanation) if q.explanation else {},
+                    prompt=prompt,
+                    answer=answer,
+                    explanation=next(explanations) if q.explanation else {},
                     references=q.references or [],
                     metadata=q.metadata_json or {},
                 )
-                for q in repo.list_questions(user_id)
+                for q, prompt, answer in zip(questions, prompts, answers)
             ]
 
     def generate_exam(
@@ -153,14 +172,17 @@ class QuizService:
             graded.append((response, is_correct))
         correct = sum(1 for _, flag in graded if flag)
         score = (correct / len(graded)) * 100 if graded else 0.0
+        encrypted_answers = self._crypto.encrypt_payloads(
+            {"value": item["user_answer"]} for item, _ in graded
+        )
         encoded_responses = [
             {
                 "question_id": item["question_id"],
-                "user_answer": self._encrypt({"value": item["user_answer"]}),
+                "user_answer": user_answer,
                 "is_correct": flag,
                 "confidence": item.get("confidence"),
             }
-            for item, flag in graded
+            for (item, flag), user_answer in zip(graded, encrypted_answers)
         ]
         with session_scope() as session:
             repo = QuizRepository(session)
@@ -171,4 +193,5 @@ class QuizService:
                 score=score,
                 responses=encoded_responses,
             )
-        return QuizAttemptResult(attempt_id=attempt.id, score=score, responses=encoded_responses)
+            attempt_id = attempt.id
+        return QuizAttemptResult(attempt_id=attempt_id, score=score, responses=encoded_responses)
@@ -0,0 +1,170 @@
+"""Search over encrypted flashcards and quiz questions through a blind token index."""
+from __future__ import annotations
+
+import functools
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Set
+
+from ..crypto import get_crypto_context
+from ..database import session_scope
+from ..models.entities import Flashcard, QuizQuestion
+from ..repositories.search_repository import SearchRepository
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+MIN_PREFIX_LENGTH = 3
+MAX_PREFIX_LENGTH = 6
+TOKEN_HASH_BYTES = 16
+TOKEN_HASH_CACHE_SIZE = 65536
+# Stored for every indexed entity, so one whose text yields no tokens still counts
+# as indexed. Keyed hashes are never empty, so no query term can match it.
+INDEXED_MARKER = b""
+FLASHCARD_SEARCH_FIELDS = ("front", "back", "extra", "prompt")
+
+_WORD_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r"\w+\*?")
+
+
+def tokenize(text: str) -> Set[str]:
+    return {
+        word[:MAX_TOKEN_LENGTH]
+        for word in _WORD_RE.findall(text.casefold())
+        if len(word) >= MIN_TOKEN_LENGTH
+    }
+
+
+def flashcard_search_text(content: dict) -> List[str]:
+    return [str(content[field]) for field in FLASHCARD_SEARCH_FIELDS if content.get(field)]
+
+
+def question_search_text(prompt: dict) -> List[str]:
+    return [str(value) for value in prompt.values() if isinstance(value, str)]
+
+
+@dataclass
+class SearchHit:
+    entity: str
+    entity_id: int
+
+
+class SearchService:
+    """Maintain and query the ``search_tokens`` index.
+
+    Every word is stored only as a truncated keyed HMAC under the user's
+    key, together with hashes of its leading ``MIN_PREFIX_LENGTH`` to
+    ``MAX_PREFIX_LENGTH`` characters under a separate purpose, so the
+    database never holds plaintext. A query term ending in ``*`` is a
+    prefix query; terms are AND-ed. Prefixes longer than
+    ``MAX_PREFIX_LENGTH`` are matched on their first ``MAX_PREFIX_LENGTH``
+    characters.
+    """
+
+    def __init__(self, encryption_key: bytes) -> None:
+        self._crypto = get_crypto_context(encryption_key)
+        # Word frequencies are heavily skewed, so bulk indexing mostly hits this cache.
+        self._hash = functools.lru_cache(maxsize=TOKEN_HASH_CACHE_SIZE)(self._keyed_hash)
+
+    def _keyed_hash(self, purpose: str, token: str) -> bytes:
+        return self._crypto.keyed_hash(purpose, token.encode("utf-8"))[:TOKEN_HASH_BYTES]
+
+    def token_hashes(self, texts: Iterable[str]) -> Set[bytes]:
+        hashes: Set[bytes] = set()
+        for text in texts:
+            for token in tokenize(text):
+                hashes.add(self._hash("search-token", token))
+                for length in range(MIN_PREFIX_LENGTH, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                    hashes.add(self._hash("search-prefix", token[:length]))
+        return hashes
+
+    def token_rows(
+        self, *, user_id: int, entity: str, entity_id: int, texts: Iterable[str]
+    ) -> List[dict]:
+        """Rows for :meth:`SearchRepository.add_tokens` covering ``texts``, plus the marker."""
+        return [
+            {"user_id": user_id, "token_hash": token_hash, "entity": entity, "entity_id": entity_id}
+            for token_hash in (INDEXED_MARKER, *self.token_hashes(texts))
+        ]
+
+    def query_hashes(self, query: str) -> List[bytes]:
+        hashes: List[bytes] = []
+        for term in _QUERY_RE.findall(query.casefold()):
+            if term.endswith("*"):
+                prefix = term[:-1]
+                if len(prefix) >= MIN_PREFIX_LENGTH:
+                    hashes.append(self._hash("search-prefix", prefix[:MAX_PREFIX_LENGTH]))
+                    continue
+                term = prefix
+            if len(term) >= MIN_TOKEN_LENGTH:
+                hashes.append(self._hash("search-token", term[:MAX_TOKEN_LENGTH]))
+        return hashes
+
+    def search(
+        self, user_id: int, query: str, *, entity: Optional[str] = None, limit: int = 50
+    ) -> List[SearchHit]:
+        hashes = self.query_hashes(query)
+        if not hashes:
+            return []
+        with session_scope() as session:
+            matches = SearchRepository(session).match(user_id, hashes, entity=entity, limit=limit)
+        return [SearchHit(entity=name, entity_id=entity_id) for name, entity_id in matches]
+
+    def index_missing(
+        self,
+        user_id: int,
+        *,
+        batch_size: int = 500,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Index flashcards and questions saved before search existed; returns how many."""
+        indexed = 0
+        sources = (
+            (Flashcard, "flashcard", "data", "flashcard", flashcard_search_text),
+            (QuizQuestion, "quiz_question", "prompt", "quiz_prompt", question_search_text),
+        )
+        for model, entity, column, cache_entity, extract in sources:
+            after_id: Optional[int] = None
+            while True:
+                with session_scope() as session:
+                    repo = SearchRepository(session)
+                    rows = repo.get_unindexed_page(
+                        model,
+                        entity,
+                        user_id,
+                        column=column,
+                        after_id=after_id,
+                        limit=batch_size,
+                    )
+                    if not rows:
+                        break
+                    payloads = self._crypto.decrypt_payloads(
+                        [getattr(row, column) for row in rows],
+                        [(cache_entity, row.id) for row in rows],
+                    )
+                    repo.add_tokens(
+                        [
+                            token
+                            for row, payload in zip(rows, payloads)
+                            for token in self.token_rows(
+                                user_id=user_id,
+                                entity=entity,
+                                entity_id=row.id,
+                                texts=extract(payload),
+                            )
+                        ]
+                    )
+                    after_id = rows[-1].id
+                    indexed += len(rows)
+                if progress is not None:
+                    progress(indexed)
+        return indexed
+
+
+__all__ = [
+    "INDEXED_MARKER",
+    "SearchHit",
+    "SearchService",
+    "flashcard_search_text",
+    "question_search_text",
+    "tokenize",
+]
@@ -0,0 +1,115 @@
+"""Qt item model that pages flashcards in from the service on demand."""
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+from PySide6 import QtCore
+
+from ..services.flashcard_service import FlashcardDTO, FlashcardService
+
+
+class FlashcardListModel(QtCore.QAbstractListModel):
+    """Virtualized flashcard list.
+
+    Rows are fetched one keyset page at a time as the view scrolls. Only the
+    ids of every fetched row are kept, while the cards themselves live only
+    in the ``resident_pages`` most recently displayed pages. A page that was
+    dropped is fetched again by keyset when the view scrolls back to it.
+    Decrypted content is bounded by the service's payload cache.
+    """
+
+    def __init__(
+        self,
+        service: FlashcardService,
+        user_id: int,
+        *,
+        page_size: int = 200,
+        resident_pages: int = 4,
+        parent: Optional[QtCore.QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._service = service
+        self._user_id = user_id
+        self._page_size = page_size
+        self._resident_pages = resident_pages
+        self._ids = array("q")
+        # Page number -> cards of that page; ``None`` marks a row deleted since it was listed.
+        self._pages: "OrderedDict[int, List[Optional[FlashcardDTO]]]" = OrderedDict()
+        self._exhausted = False
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._ids):
+            return None
+        card = self._card(index.row())
+        if card is None:
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return f"[{card.card_type}] {card.content.get('front', '')}"
+        if role == QtCore.Qt.UserRole:
+            return card
+        return None
+
+    def canFetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> None:
+        if parent.isValid() or self._exhausted:
+            return
+        after_id = self._ids[-1] if self._ids else None
+        page = self._service.get_flashcard_page(
+            self._user_id, after_id=after_id, limit=self._page_size
+        )
+        if len(page) < self._page_size:
+            self._exhausted = True
+        if not page:
+            return
+        start = len(self._ids)
+        self.beginInsertRows(QtCore.QModelIndex(), start, start + len(page) - 1)
+        # Pages are always fetched whole, so every page starts at a multiple of page_size.
+        self._ids.extend(card.id for card in page)
+        self._keep(start // self._page_size, list(page))
+        self.endInsertRows()
+
+    def reload(self) -> None:
+        """Forget every loaded row; the view fetches the first page again."""
+        self.beginResetModel()
+        self._ids = array("q")
+        self._pages.clear()
+        self._exhausted = False
+        self.endResetModel()
+
+    def _card(self, row: int) -> Optional[FlashcardDTO]:
+        number, offset = divmod(row, self._page_size)
+        page = self._pages.get(number)
+        if page is None:
+            page = self._keep(number, self._refetch(number))
+        else:
+            self._pages.move_to_end(number)
+        return page[offset]
+
+    def _refetch(self, number: int) -> List[Optional[FlashcardDTO]]:
+        start = number * self._page_size
+        ids = self._ids[start : start + self._page_size]
+        after_id = self._ids[start - 1] if start else None
+        fetched = self._service.get_flashcard_page(
+            self._user_id, after_id=after_id, limit=len(ids)
+        )
+        by_id = {card.id: card for card in fetched}
+        return [by_id.get(card_id) for card_id in ids]
+
+    def _keep(
+        self, number: int, page: List[Optional[FlashcardDTO]]
+    ) -> List[Optional[FlashcardDTO]]:
+        self._pages[number] = page
+        self._pages.move_to_end(number)
+        while len(self._pages) > self._resident_pages:
+            self._pages.popitem(last=False)
+        return page
+
+
+__all__ = ["FlashcardListModel"]
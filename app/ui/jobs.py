@@ -0,0 +1,114 @@
+"""Run long service calls on a Qt thread pool instead of the UI thread."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, List, Optional
+
+from PySide6 import QtCore
+
+LOGGER = logging.getLogger(__name__)
+
+ProgressCallback = Callable[..., None]
+
+
+class JobCancelled(Exception):
+    """Raised inside a job from its progress callback once cancellation was requested."""
+
+
+class JobSignals(QtCore.QObject):
+    progress = QtCore.Signal(int, int)
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(object)
+    cancelled = QtCore.Signal()
+
+
+class Job(QtCore.QRunnable):
+    """A unit of background work.
+
+    ``func`` receives a progress callback ``report(done, total=0)``. The
+    callback emits :attr:`JobSignals.progress` and raises
+    :class:`JobCancelled` after :meth:`cancel`, so jobs stop at their next
+    progress report. Signals are delivered on the UI thread.
+    """
+
+    def __init__(self, func: Callable[[ProgressCallback], Any]) -> None:
+        super().__init__()
+        self.setAutoDelete(False)
+        self.signals = JobSignals()
+        self._func = func
+        self._cancel_event = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    def report(self, done: int, total: int = 0) -> None:
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self) -> None:
+        try:
+            if self._cancel_event.is_set():
+                raise JobCancelled()
+            result = self._func(self.report)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as exc:  # surfaced to the UI through ``failed``
+            LOGGER.exception("Background job failed")
+            self.signals.failed.emit(exc)
+        else:
+            self.signals.finished.emit(result)
+
+
+class JobRunner(QtCore.QObject):
+    """Submit :class:`Job` instances to a ``QThreadPool`` and wire up their callbacks."""
+
+    def __init__(
+        self, parent: Optional[QtCore.QObject] = None, pool: Optional[QtCore.QThreadPool] = None
+    ) -> None:
+        super().__init__(parent)
+        self._pool = pool or QtCore.QThreadPool.globalInstance()
+        self._jobs: List[Job] = []
+
+    def submit(
+        self,
+        func: Callable[[ProgressCallback], Any],
+        *,
+        on_result: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_cancelled: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        job = Job(func)
+        if on_result is not None:
+            job.signals.finished.connect(on_result)
+        if on_error is not None:
+            job.signals.failed.connect(on_error)
+        if on_progress is not None:
+            job.signals.progress.connect(on_progress)
+        if on_cancelled is not None:
+            job.signals.cancelled.connect(on_cancelled)
+        for signal in (job.signals.finished, job.signals.failed, job.signals.cancelled):
+            signal.connect(lambda *_, job=job: self._forget(job))
+        self._jobs.append(job)
+        self._pool.start(job)
+        return job
+
+    def cancel_all(self) -> None:
+        for job in self._jobs:
+            job.cancel()
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+    def _forget(self, job: Job) -> None:
+        if job in self._jobs:
+            self._jobs.remove(job)
+
+
+__all__ = ["Job", "JobCancelled", "JobRunner", "JobSignals", "ProgressCallback"]
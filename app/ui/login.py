@@ -1,10 +1,14 @@
 """Authentication dialog for the Study Hub."""
 from __future__ import annotations
 
+from typing import Optional
+
 from PySide6 import QtCore, QtWidgets
 
+from ..security import host_kdf_params
 from ..services.auth_service import AuthService, AuthenticatedUser
 from .. import windows_hello
+from .jobs import JobRunner
 
 
 class LoginDialog(QtWidgets.QDialog):
@@ -15,7 +19,11 @@ class LoginDialog(QtWidgets.QDialog):
         self.setWindowTitle("Kakha's Study Hub - Sign In")
         self.resize(420, 240)
         self._auth_service = AuthService()
+        self._jobs = JobRunner(self)
         self._build_ui()
+        # Key derivation is calibrated once per machine and takes a few seconds;
+        # start it now so signing in rarely has to wait for it.
+        self._jobs.submit(lambda report: host_kdf_params())
 
     def _build_ui(self) -> None:
         layout = QtWidgets.QVBoxLayout(self)
@@ -54,7 +62,13 @@ class LoginDialog(QtWidgets.QDialog):
         if not username or not password:
             self.status_label.setText("Please provide both username and password.")
             return
-        user = self._auth_service.authenticate(username, password)
+        self._run(
+            lambda report: self._auth_service.authenticate(username, password),
+            self._finish_login,
+            "Signing in...",
+        )
+
+    def _finish_login(self, user: Optional[AuthenticatedUser]) -> None:
         if user:
             if self.hello_checkbox is not None:
                 self.hello_checkbox.setChecked(user.hello_enabled)
@@ -74,15 +88,43 @@ class LoginDialog(QtWidgets.QDialog):
         if len(password) < 8:
             self.status_label.setText("Password must be at least 8 characters.")
             return
-        try:
-            user = self._auth_service.register(username, password)
-        except ValueError as exc:
-            self.status_label.setText(str(exc))
-            return
+        self._run(
+            lambda report: self._auth_service.register(username, password),
+            self._finish_register,
+            "Creating account...",
+        )
+
+    def _finish_register(self, user: AuthenticatedUser) -> None:
         self._persist_hello_choice(user.username)
         self.authenticated.emit(user)
         self.accept()
 
+    def _run(self, func, on_result, status: str) -> None:
+        """Run a key-deriving call off the UI thread with the buttons disabled."""
+        self._set_busy(True)
+        self.status_label.setText(status)
+
+        def finish(result) -> None:
+            self._set_busy(False)
+            self.status_label.clear()
+            on_result(result)
+
+        def fail(exc: Exception) -> None:
+            self._set_busy(False)
+            message = str(exc) if isinstance(exc, ValueError) else "Sign-in failed."
+            self.status_label.setText(message)
+
+        self._jobs.submit(func, on_result=finish, on_error=fail)
+
+    def done(self, result: int) -> None:
+        # Jobs call back into the dialog, so it must outlive them.
+        self._jobs.wait()
+        super().done(result)
+
+    def _set_busy(self, busy: bool) -> None:
+        self.login_button.setEnabled(not busy)
+        self.register_button.setEnabled(not busy)
+
     def _persist_hello_choice(self, username: str) -> None:
         if self.hello_checkbox is None:
             return
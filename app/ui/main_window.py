@@ -8,16 +8,21 @@ from pathlib import Path
 from PySide6 import QtCore, QtGui, QtWidgets
 
 from ..config import paths
+from ..crypto import release_crypto_contexts
 from ..services.analytics_service import AnalyticsService
 from ..services.auth_service import AuthenticatedUser
 from ..services.content_pack_service import ContentPackService
 from ..services.flashcard_service import FlashcardService
 from ..services.lab_service import LabService
+from ..services.payload_migration_service import PayloadMigrationService
 from ..services.quiz_service import QuizService
+from ..services.search_service import SearchService
 from ..importers.anki_importer import AnkiImporter
 from ..importers.csv_importer import CSVImporter, TSVImporter
 from ..importers.markdown_importer import MarkdownImporter
 from ..importers.paste_importer import BulkPasteImporter
+from .flashcard_model import FlashcardListModel
+from .jobs import Job, JobRunner
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -31,7 +36,60 @@ class MainWindow(QtWidgets.QMainWindow):
         self._analytics = AnalyticsService(str(paths.root))
         self._labs = LabService(user.encryption_key)
         self._packs = ContentPackService(user.encryption_key)
+        self._search = SearchService(user.encryption_key)
+        self._payloads = PayloadMigrationService(user.encryption_key)
+        self._jobs = JobRunner(self)
         self._setup_ui()
+        self._jobs.submit(self._run_maintenance)
+
+    def _run_maintenance(self, progress) -> None:
+        """Bring content saved by older versions up to date.
+
+        That covers duplicate fingerprints, the search index, the payload
+        envelope and attachments still stored inside the database.
+        """
+        self._flashcards.backfill_fingerprints(self.user.id, progress=progress)
+        self._search.index_missing(self.user.id, progress=progress)
+        self._payloads.migrate(self.user.id, progress=progress)
+        self._labs.migrate_inline_attachments(self.user.id, progress=progress)
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        self._jobs.cancel_all()
+        self._jobs.wait()
+        release_crypto_contexts()
+        super().closeEvent(event)
+
+    def _run_in_background(self, title: str, func, on_result) -> Job:
+        """Run ``func(progress)`` on the job runner behind a cancellable progress dialog."""
+        dialog = QtWidgets.QProgressDialog(title, "Cancel", 0, 0, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(QtCore.Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        def on_progress(done: int, total: int) -> None:
+            if total:
+                dialog.setMaximum(total)
+                dialog.setValue(done)
+            else:
+                dialog.setLabelText(f"{title} ({done} done)")
+
+        def on_finished(result) -> None:
+            dialog.reset()
+            on_result(result)
+
+        def on_error(exc: Exception) -> None:
+            dialog.reset()
+            QtWidgets.QMessageBox.warning(self, title, f"{title} failed: {exc}")
+
+        job = self._jobs.submit(
+            func,
+            on_result=on_finished,
+            on_error=on_error,
+            on_progress=on_progress,
+            on_cancelled=dialog.reset,
+        )
+        dialog.canceled.connect(job.cancel)
+        return job
 
     def _setup_ui(self) -> None:
         tabs = QtWidgets.QTabWidget()
@@ -89,7 +147,20 @@ class MainWindow(QtWidgets.QMainWindow):
         import_layout.addWidget(paste_btn)
         layout.addWidget(import_group)
 
-        self.flashcard_list = QtWidgets.QListWidget()
+        search_group = QtWidgets.QGroupBox("Search Cards")
+        search_layout = QtWidgets.QVBoxLayout(search_group)
+        self.search_edit = QtWidgets.QLineEdit()
+        self.search_edit.setPlaceholderText("Words to match; end a word with * to match a prefix")
+        self.search_edit.returnPressed.connect(self._search_flashcards)
+        search_layout.addWidget(self.search_edit)
+        self.search_results = QtWidgets.QListWidget()
+        search_layout.addWidget(self.search_results)
+        layout.addWidget(search_group)
+
+        self.flashcard_model = FlashcardListModel(self._flashcards, self.user.id, parent=self)
+        self.flashcard_list = QtWidgets.QListView()
+        self.flashcard_list.setUniformItemSizes(True)
+        self.flashcard_list.setModel(self.flashcard_model)
         layout.addWidget(self.flashcard_list)
         refresh_btn = QtWidgets.QPushButton("Refresh")
         refresh_btn.clicked.connect(self._refresh_flashcards)
@@ -110,22 +181,27 @@ class MainWindow(QtWidgets.QMainWindow):
             "back": self.card_back.toPlainText(),
             "created": dt.datetime.utcnow().isoformat(),
         }
-        self._flashcards.create_flashcard(
-            user_id=self.user.id,
-            deck_id=None,
-            card_type=self.card_type_combo.currentText(),
-            content=content,
-        )
+        try:
+            self._flashcards.create_flashcard(
+                user_id=self.user.id,
+                deck_id=None,
+                card_type=self.card_type_combo.currentText(),
+                content=content,
+            )
+        except ValueError as exc:
+            QtWidgets.QMessageBox.warning(self, "Duplicate", str(exc))
+            return
         self.card_front.clear()
         self.card_back.clear()
         self._refresh_flashcards()
 
+    def _search_flashcards(self) -> None:
+        self.search_results.clear()
+        for card in self._flashcards.search_flashcards(self.user.id, self.search_edit.text()):
+            self.search_results.addItem(f"[{card.card_type}] {card.content.get('front', '')}")
+
     def _refresh_flashcards(self) -> None:
-        self.flashcard_list.clear()
-        for card in self._flashcards.list_flashcards(self.user.id):
-            item = QtWidgets.QListWidgetItem(f"[{card.card_type}] {card.content.get('front', '')}")
-            item.setData(QtCore.Qt.UserRole, card)
-            self.flashcard_list.addItem(item)
+        self.flashcard_model.reload()
 
     def _import_cards(self) -> None:
         path, _ = QtWidgets.QFileDialog.getOpenFileName(
@@ -146,10 +222,20 @@ class MainWindow(QtWidgets.QMainWindow):
         if importer is None:
             QtWidgets.QMessageBox.warning(self, "Unsupported", "Unsupported file format.")
             return
-        cards = list(importer.load(Path(path)))
-        count = self._flashcards.bulk_import(user_id=self.user.id, cards=cards)
-        QtWidgets.QMessageBox.information(self, "Import Complete", f"Imported {count} cards")
-        self._refresh_flashcards()
+        self._import_in_background(importer.load(Path(path)))
+
+    def _import_in_background(self, cards) -> None:
+        def on_result(count: int) -> None:
+            QtWidgets.QMessageBox.information(self, "Import Complete", f"Imported {count} cards")
+            self._refresh_flashcards()
+
+        self._run_in_background(
+            "Importing cards",
+            lambda progress: self._flashcards.bulk_import(
+                user_id=self.user.id, cards=cards, progress=progress
+            ),
+            on_result,
+        )
 
     def _bulk_paste(self) -> None:
         text, ok = QtWidgets.QInputDialog.getMultiLineText(
@@ -158,10 +244,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if not ok or not text.strip():
             return
         importer = BulkPasteImporter(text)
-        cards = list(importer.load(Path("/dev/null")))
-        count = self._flashcards.bulk_import(user_id=self.user.id, cards=cards)
-        QtWidgets.QMessageBox.information(self, "Import Complete", f"Imported {count} cards")
-        self._refresh_flashcards()
+        self._import_in_background(importer.load(Path("/dev/null")))
 
     # Quizzes
     def _build_quiz_tab(self) -> QtWidgets.QWidget:
@@ -200,7 +283,7 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QMessageBox.information(self, "Blueprint", f"Created blueprint #{blueprint_id}")
 
     def _add_question_from_card(self) -> None:
-        cards = self._flashcards.list_flashcards(self.user.id)
+        cards = self._flashcards.get_flashcard_page(self.user.id, limit=1)
         if not cards:
             QtWidgets.QMessageBox.information(self, "No Cards", "Create flashcards first.")
             return
@@ -246,13 +329,16 @@ class MainWindow(QtWidgets.QMainWindow):
             )
         if not responses:
             return
-        result = self._quiz.grade_attempt(
-            user_id=self.user.id,
-            blueprint_id=None,
-            mode="practice",
-            responses=responses,
+        self._run_in_background(
+            "Grading quiz",
+            lambda progress: self._quiz.grade_attempt(
+                user_id=self.user.id,
+                blueprint_id=None,
+                mode="practice",
+                responses=responses,
+            ),
+            lambda result: self.quiz_result_label.setText(f"Last Score: {result.score:.1f}%"),
         )
-        self.quiz_result_label.setText(f"Last Score: {result.score:.1f}%")
 
     # Labs
     def _build_labs_tab(self) -> QtWidgets.QWidget:
@@ -282,8 +368,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _refresh_labs(self) -> None:
         self.labs_list.clear()
-        for checklist in self._labs.list_checklists(self.user.id):
-            item = QtWidgets.QListWidgetItem(f"{checklist['name']} ({len(checklist['tasks'])} tasks)")
+        for summary in self._labs.checklist_summaries(self.user.id):
+            item = QtWidgets.QListWidgetItem(f"{summary.name} ({summary.task_count} tasks)")
             self.labs_list.addItem(item)
 
     # Analytics
@@ -299,9 +385,15 @@ class MainWindow(QtWidgets.QMainWindow):
         return widget
 
     def _generate_analytics(self) -> None:
-        summary = self._analytics.generate_summary(self.user.id)
-        pixmap = QtGui.QPixmap(summary.heatmap_path)
-        self.analytics_image.setPixmap(pixmap.scaled(600, 200, QtCore.Qt.KeepAspectRatio))
+        def on_result(summary) -> None:
+            pixmap = QtGui.QPixmap(summary.heatmap_path)
+            self.analytics_image.setPixmap(pixmap.scaled(600, 200, QtCore.Qt.KeepAspectRatio))
+
+        self._run_in_background(
+            "Generating analytics",
+            lambda progress: self._analytics.generate_summary(self.user.id, progress),
+            on_result,
+        )
 
     # Content Packs
     def _build_packs_tab(self) -> QtWidgets.QWidget:
@@ -325,9 +417,16 @@ class MainWindow(QtWidgets.QMainWindow):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Install Pack", str(Path.home()), "Pack (*.zip *.apkg)")
         if not path:
             return
-        info = self._packs.install_pack(self.user.id, Path(path))
-        QtWidgets.QMessageBox.information(self, "Pack", f"Installed {info.name} v{info.version}")
-        self._refresh_packs()
+
+        def on_result(info) -> None:
+            QtWidgets.QMessageBox.information(self, "Pack", f"Installed {info.name} v{info.version}")
+            self._refresh_packs()
+
+        self._run_in_background(
+            "Installing pack",
+            lambda progress: self._packs.install_pack(self.user.id, Path(path), progress),
+            on_result,
+        )
 
     def _refresh_packs(self) -> None:
         self.packs_list.clear()
@@ -344,6 +443,9 @@ class MainWindow(QtWidgets.QMainWindow):
         dest, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Pack", str(Path.home() / "pack.zip"), "Zip (*.zip)")
         if not dest:
             return
-        self._packs.export_pack(self.user.id, packs[0].id, Path(dest))
-        QtWidgets.QMessageBox.information(self, "Export", "Pack exported successfully.")
+        self._run_in_background(
+            "Exporting pack",
+            lambda progress: self._packs.export_pack(self.user.id, packs[0].id, Path(dest), progress),
+            lambda _: QtWidgets.QMessageBox.information(self, "Export", "Pack exported successfully."),
+        )
 
@@ -0,0 +1,40 @@
+"""Benchmark helpers.
+
+Benchmarks run with the rest of the suite at sizes that keep it fast.
+They assert on sizes and memory, and on timings only where one path is
+several times faster than the other. Set ``STUDY_HUB_BENCH_SCALE``
+(e.g. ``50``) to run them at realistic sizes, and ``-s`` to see the
+measured numbers.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Callable
+
+import pytest
+
+SCALE = float(os.environ.get("STUDY_HUB_BENCH_SCALE", "1"))
+
+
+class Bench:
+    def scaled(self, count: int) -> int:
+        return max(1, int(count * SCALE))
+
+    def time(self, function: Callable[[], object], *, repeat: int = 3) -> float:
+        """Best wall time of ``repeat`` calls, in seconds."""
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def report(self, name: str, **numbers: float) -> None:
+        details = ", ".join(f"{label} {value:.4g}" for label, value in numbers.items())
+        print(f"\n[bench] {name}: {details}")
+
+
+@pytest.fixture
+def bench() -> Bench:
+    return Bench()
@@ -0,0 +1,174 @@
+"""Streaming Anki import: memory stays flat as the deck grows.
+
+Each benchmark runs a small deck and one four times larger, with eight
+reviews per note. At the default scale the large loader deck has 64k
+revlog rows; ``STUDY_HUB_BENCH_SCALE=16`` brings it to 128k notes and
+about 1M rows (and the large import deck to 32k notes).
+"""
+import json
+import sqlite3
+import time
+import tracemalloc
+import zipfile
+
+from sqlalchemy import func, select
+
+from app.database import session_scope
+from app.importers.anki_importer import AnkiImporter
+from app.models.entities import Flashcard, ReviewLog
+from app.services.flashcard_service import FlashcardService
+
+REVIEWS_PER_NOTE = 8
+CREATED = 1_600_000_000
+# Note text is drawn from a fixed vocabulary, so the search-token hash cache
+# stops growing early and only the deck size differs between runs.
+WORDS = [f"word{chr(97 + a)}{chr(97 + b)}" for a in range(7) for b in range(7)]
+
+
+def _text(note):
+    """``note`` spelled as four base-``len(WORDS)`` digits: distinct, equally long text."""
+    words = []
+    for _ in range(4):
+        note, digit = divmod(note, len(WORDS))
+        words.append(WORDS[digit])
+    return " ".join(words)
+
+
+def _write_deck(path, notes):
+    database = path.with_suffix(".anki21")
+    connection = sqlite3.connect(database)
+    connection.executescript(
+        """
+        CREATE TABLE col (id INTEGER PRIMARY KEY, crt INTEGER, models TEXT);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT);
+        CREATE TABLE cards (
+            id INTEGER PRIMARY KEY, nid INTEGER, ord INTEGER, type INTEGER, queue INTEGER,
+            due INTEGER, odue INTEGER, odid INTEGER, ivl INTEGER, factor INTEGER, lapses INTEGER
+        );
+        CREATE TABLE revlog (
+            id INTEGER PRIMARY KEY, cid INTEGER, ease INTEGER, ivl INTEGER, factor INTEGER
+        );
+        """
+    )
+    connection.execute(
+        "INSERT INTO col VALUES (1, ?, ?)", (CREATED, json.dumps({"1": {"name": "Basic"}}))
+    )
+    connection.executemany(
+        "INSERT INTO notes VALUES (?, 1, ?)",
+        ((note, f"{_text(note)}\x1fback {_text(note)}") for note in range(1, notes + 1)),
+    )
+    connection.executemany(
+        "INSERT INTO cards VALUES (?, ?, 0, 2, 2, 100, 0, 0, 30, 2500, 1)",
+        ((note * 10, note) for note in range(1, notes + 1)),
+    )
+    # Reviews are inserted in time order, interleaved across cards, as Anki writes them.
+    connection.executemany(
+        "INSERT INTO revlog VALUES (?, ?, ?, ?, 2500)",
+        (
+            (CREATED * 1000 + review * notes + note, note * 10, 1 + (review + note) % 4, review)
+            for review in range(REVIEWS_PER_NOTE)
+            for note in range(1, notes + 1)
+        ),
+    )
+    connection.commit()
+    connection.close()
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.write(database, "collection.anki21")
+    return path
+
+
+def _streaming_peak(path):
+    """Records yielded and peak memory while streaming them, after extraction."""
+    records = iter(AnkiImporter().load(path))
+    tracemalloc.start()
+    try:
+        # The first record waits for the collection to be copied out in 1 MiB blocks.
+        count = 1 if next(records, None) is not None else 0
+        tracemalloc.reset_peak()
+        count += sum(1 for _ in records)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return count, peak
+
+
+def test_loader_memory_does_not_grow_with_the_deck(bench, tmp_path):
+    small = bench.scaled(2000)
+    sizes = {}
+    for notes in (small, small * 4):
+        count, peak = _streaming_peak(_write_deck(tmp_path / f"deck{notes}.apkg", notes))
+        assert count == notes
+        sizes[notes] = peak
+    bench.report(
+        "anki load peak",
+        notes=small,
+        peak_kib=sizes[small] / 1024,
+        notes_x4=small * 4,
+        peak_x4_kib=sizes[small * 4] / 1024,
+    )
+    assert sizes[small * 4] < sizes[small] * 1.3
+
+
+def _after_first(records):
+    """Pass ``records`` through, resetting the traced peak once extraction is done."""
+    for index, record in enumerate(records):
+        yield record
+        if index == 0:
+            tracemalloc.reset_peak()
+
+
+def _import_peak(service, user_id, path):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        # Batches well below the small deck, so both runs reach their steady state.
+        records = AnkiImporter(batch_size=50).load(path)
+        imported = service.bulk_import(user_id=user_id, cards=_after_first(records), chunk_size=100)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return imported, elapsed, peak
+
+
+def test_import_memory_does_not_grow_with_the_deck(bench, tmp_path, user_id, key):
+    service = FlashcardService(key)
+    small = bench.scaled(500)
+    runs = {}
+    for notes in (small, small * 4):
+        path = _write_deck(tmp_path / f"deck{notes}.apkg", notes)
+        # A fresh user per deck, so the second import is not skipped as duplicates.
+        owner = user_id if notes == small else _another_user()
+        imported, elapsed, peak = _import_peak(service, owner, path)
+        with session_scope() as session:
+            logs = session.scalar(
+                select(func.count(ReviewLog.id))
+                .join(Flashcard, Flashcard.id == ReviewLog.flashcard_id)
+                .where(Flashcard.user_id == owner)
+            )
+        assert imported == notes and logs == notes * REVIEWS_PER_NOTE
+        runs[notes] = (elapsed, peak)
+    bench.report(
+        "anki import",
+        notes=small,
+        peak_kib=runs[small][1] / 1024,
+        notes_x4=small * 4,
+        peak_x4_kib=runs[small * 4][1] / 1024,
+        notes_per_s_x4=small * 4 / runs[small * 4][0],
+    )
+    assert runs[small * 4][1] < runs[small][1] * 1.3
+
+
+def _another_user():
+    from app.models.entities import User
+
+    with session_scope() as session:
+        user = User(
+            username=f"anki-bench-{time.monotonic_ns()}",
+            password_hash="x",
+            password_salt=b"salt",
+            encryption_blob=b"blob",
+        )
+        session.add(user)
+        session.flush()
+        return user.id
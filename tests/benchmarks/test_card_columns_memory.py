@@ -0,0 +1,58 @@
+"""Retained-memory benchmark for bulk card results."""
+import gc
+import tracemalloc
+
+import pytest
+
+from app.crypto import get_crypto_context
+from app.services.flashcard_service import FlashcardService
+
+CARDS = 2000
+
+
+def _retained(crypto, load):
+    """Bytes still allocated by ``load()`` once its result is all that is left."""
+    crypto.cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = load()
+        # Decrypted payloads parked in the shared cache are not part of the result.
+        crypto.cache.clear()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(result) == CARDS
+    return retained
+
+
+@pytest.fixture
+def filled(user_id, key):
+    service = FlashcardService(key)
+    service.bulk_import(
+        user_id=user_id,
+        cards=(
+            {
+                "front": f"Question {index}: what does term {index} mean?",
+                "back": f"Term {index} is explained at some length. " * 3,
+                "metadata": {"source": "benchmark", "tags": ["memory"]},
+            }
+            for index in range(CARDS)
+        ),
+    )
+    return service, user_id
+
+
+def test_columns_retain_far_less_than_dtos(bench, filled, key):
+    service, user_id = filled
+    crypto = get_crypto_context(key)
+    dtos = _retained(crypto, lambda: service.list_flashcards(user_id))
+    columns = _retained(crypto, lambda: service.list_flashcard_columns(user_id))
+    bench.report(
+        "retained by card listings",
+        cards=CARDS,
+        dtos_kib=dtos / 1024,
+        columns_kib=columns / 1024,
+    )
+    assert columns * 3 < dtos
@@ -0,0 +1,76 @@
+"""Size and time of sealing payloads with and without compression."""
+import os
+
+from app.compression import CODEC_NONE, MAX_COMPRESSION_THRESHOLD, CompressionPolicy
+from app.crypto import CryptoContext
+
+
+def _contexts(key):
+    # A threshold above every payload below turns compression off.
+    never = CompressionPolicy(threshold=MAX_COMPRESSION_THRESHOLD * 64)
+    plain = CryptoContext(key, compression=never)
+    return plain, CryptoContext(key)
+
+
+def _manifest(items):
+    return {
+        "name": "Networking pack",
+        "version": "1.0",
+        "items": [
+            {
+                "type": "flashcard",
+                "front": f"What does port {index} usually carry?",
+                "back": f"Port {index} is registered for service number {index % 97}.",
+                "tags": ["networking", "ports", f"range-{index // 100}"],
+            }
+            for index in range(items)
+        ],
+    }
+
+
+def test_large_manifests_shrink(bench, key):
+    plain, compressed = _contexts(key)
+    manifest = _manifest(bench.scaled(2000))
+    raw = plain.encrypt_payload(manifest)
+    sealed = compressed.encrypt_payload(manifest)
+    assert sealed[0] >> 4 != CODEC_NONE
+    assert compressed.decrypt_payload(sealed) == manifest
+    bench.report(
+        "manifest",
+        raw_kb=len(raw) / 1000,
+        sealed_kb=len(sealed) / 1000,
+        seal_ms=bench.time(lambda: compressed.encrypt_payload(manifest)) * 1000,
+        seal_raw_ms=bench.time(lambda: plain.encrypt_payload(manifest)) * 1000,
+        open_ms=bench.time(lambda: compressed.decrypt_payload(sealed)) * 1000,
+    )
+    assert len(sealed) < len(raw) * 0.3
+
+
+def test_lab_notes_shrink(bench, key):
+    plain, compressed = _contexts(key)
+    notes = [
+        {
+            "notes": (
+                f"Step {index}: configure VLAN {index % 40} on the access switch, "
+                "verify trunking with show interfaces trunk, then confirm the "
+                "router-on-a-stick subinterfaces answer pings from each VLAN. "
+            )
+            * 6
+        }
+        for index in range(bench.scaled(300))
+    ]
+    raw = sum(len(blob) for blob in plain.encrypt_payloads(notes))
+    sealed = compressed.encrypt_payloads(notes)
+    assert compressed.decrypt_payloads(sealed) == notes
+    total = sum(len(blob) for blob in sealed)
+    bench.report("lab notes", payloads=len(notes), raw_kb=raw / 1000, sealed_kb=total / 1000)
+    assert total < raw * 0.5
+
+
+def test_small_and_random_payloads_are_left_alone(key):
+    plain, compressed = _contexts(key)
+    card = {"front": "Default HTTPS port?", "back": "443"}
+    assert len(compressed.encrypt_payload(card)) == len(plain.encrypt_payload(card))
+    noise = os.urandom(8192)
+    sealed = compressed.encrypt(noise)
+    assert sealed[0] >> 4 == CODEC_NONE and len(sealed) == len(plain.encrypt(noise))
@@ -0,0 +1,55 @@
+"""Listing rows through the prepared Core selects against loading ORM entities."""
+import os
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import undefer
+
+from app.database import session_scope
+from app.models.entities import Flashcard
+from app.repositories.flashcard_repository import FlashcardRepository
+
+
+def _orm_rows(user_id):
+    """What the listing did before: full entities, unpacked into the same tuples."""
+    with session_scope() as session:
+        cards = session.scalars(
+            select(Flashcard).options(undefer(Flashcard.data)).where(Flashcard.user_id == user_id)
+        ).all()
+        return [
+            (card.id, card.deck_id, card.card_type, card.data, card.metadata_json)
+            for card in cards
+        ]
+
+
+def _core_rows(user_id):
+    with session_scope() as session:
+        return [tuple(row) for row in FlashcardRepository(session).get_flashcard_rows(user_id)]
+
+
+def test_core_listing_outpaces_the_orm(bench, user_id):
+    count = bench.scaled(10000)
+    with session_scope() as session:
+        session.execute(
+            insert(Flashcard),
+            [
+                {
+                    "user_id": user_id,
+                    "card_type": "basic",
+                    "data": os.urandom(120),
+                    "metadata_json": {"source": "bench", "tags": ["a", "b"]},
+                }
+                for _ in range(count)
+            ],
+        )
+    assert sorted(_core_rows(user_id)) == sorted(_orm_rows(user_id))
+
+    orm = bench.time(lambda: _orm_rows(user_id))
+    core = bench.time(lambda: _core_rows(user_id))
+    bench.report(
+        "flashcard listing",
+        rows=count,
+        orm_rows_per_s=count / orm,
+        core_rows_per_s=count / core,
+        speedup=orm / core,
+    )
+    assert core * 1.5 < orm
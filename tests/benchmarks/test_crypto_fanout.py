@@ -0,0 +1,48 @@
+"""Batch encryption on the shared thread pool against a single thread.
+
+Wall-clock ratios depend on the runner's load, so the speedup is only
+reported, never asserted.
+"""
+import os
+
+import pytest
+
+from app.compression import CompressionPolicy
+from app.crypto import CryptoContext
+
+PAYLOAD_BYTES = 2048
+
+
+def test_thread_fan_out_scales_with_cores(bench, key):
+    cores = os.cpu_count() or 1
+    if cores == 1:
+        pytest.skip("a single core never reaches the pool, so there is nothing to compare")
+    items = [os.urandom(PAYLOAD_BYTES) for _ in range(bench.scaled(4000))]
+    # Keep compression out of it: only the fan-out of sealing is measured.
+    serial = CryptoContext(
+        key,
+        parallel_threshold=len(items) + 1,
+        compression=CompressionPolicy(threshold=PAYLOAD_BYTES + 1),
+    )
+    pooled = CryptoContext(key, compression=CompressionPolicy(threshold=PAYLOAD_BYTES + 1))
+    sealed = pooled.encrypt_many(items)
+    assert serial.decrypt_many(sealed) == items
+
+    timings = {
+        "encrypt": (
+            bench.time(lambda: serial.encrypt_many(items)),
+            bench.time(lambda: pooled.encrypt_many(items)),
+        ),
+        "decrypt": (
+            bench.time(lambda: serial.decrypt_many(sealed)),
+            bench.time(lambda: pooled.decrypt_many(sealed)),
+        ),
+    }
+    for operation, (single, fanned) in timings.items():
+        bench.report(
+            f"{operation}_many x{len(items)}",
+            cores=cores,
+            single_s=single,
+            pool_s=fanned,
+            speedup=single / fanned,
+        )
@@ -0,0 +1,106 @@
+"""Ciphertext read by the analytics attempt load, deferred against eager."""
+import os
+import random
+
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+
+from app.database import get_engine, session_scope
+from app.models.entities import QuizAttempt, QuizQuestion, QuizResponse
+from app.repositories.analytics_repository import AnalyticsRepository
+
+ENCRYPTED = ("prompt", "answer", "explanation", "user_answer")
+
+
+def _populate(user_id, questions, attempts, answers):
+    rng = random.Random(7)
+    with session_scope() as session:
+        pool = [
+            QuizQuestion(
+                user_id=user_id,
+                question_type="single",
+                prompt=os.urandom(900),
+                answer=os.urandom(200),
+                explanation=os.urandom(600),
+                metadata_json={"section": f"Section {index % 5}"},
+            )
+            for index in range(questions)
+        ]
+        session.add_all(pool)
+        for _ in range(attempts):
+            attempt = QuizAttempt(user_id=user_id, mode="exam", score=70)
+            attempt.responses = [
+                QuizResponse(question=question, user_answer=os.urandom(300), confidence=3)
+                for question in rng.sample(pool, answers)
+            ]
+            session.add(attempt)
+
+
+def _eager(session, user_id):
+    """The analytics load with every encrypted column undeferred."""
+    return (
+        session.query(QuizAttempt)
+        .options(
+            selectinload(QuizAttempt.responses)
+            .undefer(QuizResponse.user_answer)
+            .selectinload(QuizResponse.question)
+            .undefer(QuizQuestion.prompt)
+            .undefer(QuizQuestion.answer)
+            .undefer(QuizQuestion.explanation)
+        )
+        .filter(QuizAttempt.user_id == user_id)
+        .order_by(QuizAttempt.started_at.desc())
+        .limit(50)
+        .all()
+    )
+
+
+def _ciphertext_loaded(attempts):
+    """Bytes of encrypted columns already loaded on the returned objects."""
+    total = 0
+    for attempt in attempts:
+        for response in attempt.responses:
+            for target in (response, response.question):
+                total += sum(len(target.__dict__.get(name) or b"") for name in ENCRYPTED)
+    return total
+
+
+def _load(user_id, query):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with session_scope() as session:
+            attempts = query(session)
+            loaded = _ciphertext_loaded(attempts)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return loaded, statements
+
+
+def test_analytics_load_reads_no_ciphertext(bench, user_id):
+    _populate(user_id, questions=bench.scaled(500), attempts=50, answers=20)
+    deferred = lambda session: AnalyticsRepository(session).get_recent_quiz_attempts(user_id)
+    eager = lambda session: _eager(session, user_id)
+
+    deferred_bytes, statements = _load(user_id, deferred)
+    eager_bytes, eager_statements = _load(user_id, eager)
+    bench.report(
+        "analytics attempt load",
+        deferred_kb=deferred_bytes / 1000,
+        eager_kb=eager_bytes / 1000,
+        deferred_ms=bench.time(lambda: _load(user_id, deferred)) * 1000,
+        eager_ms=bench.time(lambda: _load(user_id, eager)) * 1000,
+    )
+    assert eager_bytes > 0 and deferred_bytes == 0
+    assert _selects_ciphertext(eager_statements)
+    assert not _selects_ciphertext(statements)
+
+
+def _selects_ciphertext(statements):
+    selected = " ".join(statement.split(" FROM ")[0] for statement in statements)
+    return any(f".{column}" in selected for column in ENCRYPTED)
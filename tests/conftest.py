@@ -0,0 +1,43 @@
+"""Shared fixtures: every test session gets its own throwaway data directory."""
+from __future__ import annotations
+
+import itertools
+import os
+import tempfile
+
+# ``app.config`` resolves the data directory from the home directory at import time.
+os.environ["HOME"] = tempfile.mkdtemp(prefix="study-hub-tests-")
+
+import pytest
+from cryptography.fernet import Fernet
+
+_usernames = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def database():
+    from app.bootstrap_db import ensure_database
+
+    ensure_database()
+
+
+@pytest.fixture
+def user_id(database) -> int:
+    from app.database import session_scope
+    from app.models.entities import User
+
+    with session_scope() as session:
+        user = User(
+            username=f"user{next(_usernames)}",
+            password_hash="x",
+            password_salt=b"salt",
+            encryption_blob=b"blob",
+        )
+        session.add(user)
+        session.flush()
+        return user.id
+
+
+@pytest.fixture
+def key() -> bytes:
+    return Fernet.generate_key()
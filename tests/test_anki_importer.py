@@ -0,0 +1,84 @@
+import datetime as dt
+import json
+import sqlite3
+import zipfile
+
+import pytest
+
+from app.importers.anki_importer import AnkiImporter
+
+CREATED = 1_600_000_000
+NOW = 1_792_193_230
+
+
+def _write_apkg(path, cards):
+    """``cards`` are ``(type, queue, due, odue, odid)`` tuples, one note each."""
+    database = path.parent / "collection.anki21"
+    connection = sqlite3.connect(database)
+    connection.executescript(
+        """
+        CREATE TABLE col (id INTEGER PRIMARY KEY, crt INTEGER, models TEXT);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT);
+        CREATE TABLE cards (
+            id INTEGER PRIMARY KEY, nid INTEGER, ord INTEGER, type INTEGER, queue INTEGER,
+            due INTEGER, odue INTEGER, odid INTEGER, ivl INTEGER, factor INTEGER, lapses INTEGER
+        );
+        CREATE TABLE revlog (
+            id INTEGER PRIMARY KEY, cid INTEGER, ease INTEGER, ivl INTEGER, factor INTEGER
+        );
+        """
+    )
+    connection.execute(
+        "INSERT INTO col VALUES (1, ?, ?)", (CREATED, json.dumps({"1": {"name": "Basic"}}))
+    )
+    for note_id, (card_type, queue, due, odue, odid) in enumerate(cards, start=1):
+        connection.execute("INSERT INTO notes VALUES (?, 1, ?)", (note_id, f"f{note_id}\x1fb"))
+        connection.execute(
+            "INSERT INTO cards VALUES (?, ?, 0, ?, ?, ?, ?, ?, 3, 2500, 0)",
+            (note_id * 10, note_id, card_type, queue, due, odue, odid),
+        )
+    connection.commit()
+    connection.close()
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.write(database, "collection.anki21")
+
+
+def _due_dates(tmp_path, cards):
+    path = tmp_path / "deck.apkg"
+    _write_apkg(path, cards)
+    return [record["state"]["due_at"] for record in AnkiImporter().load(path)]
+
+
+@pytest.mark.parametrize(
+    "card_type, queue",
+    [
+        (1, 1),  # learning
+        (3, 1),  # relearning
+        (1, -1),  # suspended while learning
+        (3, -2),  # buried by the user while relearning
+        (1, -3),  # buried by the scheduler while learning
+    ],
+)
+def test_learning_cards_read_due_as_timestamp(tmp_path, card_type, queue):
+    (due_at,) = _due_dates(tmp_path, [(card_type, queue, NOW, 0, 0)])
+    assert due_at == dt.datetime.utcfromtimestamp(NOW)
+
+
+@pytest.mark.parametrize("card_type, queue", [(2, 2), (2, -1), (3, 3)])
+def test_review_and_day_learning_cards_read_due_as_days(tmp_path, card_type, queue):
+    (due_at,) = _due_dates(tmp_path, [(card_type, queue, 100, 0, 0)])
+    assert due_at == dt.datetime.utcfromtimestamp(CREATED) + dt.timedelta(days=100)
+
+
+def test_filtered_deck_cards_use_original_due(tmp_path):
+    # In a filtered deck ``due`` is a position in that deck, not a date.
+    review, learning = _due_dates(tmp_path, [(2, 2, -100_000, 100, 5), (1, 1, 7, NOW, 5)])
+    assert review == dt.datetime.utcfromtimestamp(CREATED) + dt.timedelta(days=100)
+    assert learning == dt.datetime.utcfromtimestamp(NOW)
+
+
+def test_new_cards_have_no_state(tmp_path):
+    path = tmp_path / "deck.apkg"
+    _write_apkg(path, [(0, 0, 1, 0, 0)])
+    (record,) = AnkiImporter().load(path)
+    assert "state" not in record
@@ -0,0 +1,52 @@
+import datetime as dt
+
+import pytest
+
+from app.database import get_engine, session_scope
+from app.migrations import _backfill_card_states
+from app.repositories.flashcard_repository import FlashcardRepository
+from app.services.flashcard_service import FlashcardService
+
+HISTORIES = [
+    [4, 1, 1],
+    [4, 1, 4, 1],
+    [1, 1, 4],
+    [4, 4, 4],
+    [1],
+    [5, 2, 3, 0, None, 4],
+]
+
+
+@pytest.mark.parametrize("ratings", HISTORIES)
+def test_backfill_matches_runtime_replay(user_id, key, ratings):
+    service = FlashcardService(key)
+    card = service.create_flashcard(
+        user_id=user_id,
+        deck_id=None,
+        card_type="basic",
+        content={"front": f"backfill {user_id}", "back": "b"},
+    )
+    start = dt.datetime(2024, 1, 1)
+    with session_scope() as session:
+        FlashcardRepository(session).bulk_add_review_logs(
+            [
+                {
+                    "flashcard_id": card.id,
+                    "scheduled_at": start + dt.timedelta(days=index + 1),
+                    "reviewed_at": start + dt.timedelta(days=index),
+                    "rating": rating,
+                    "interval": index,
+                    "ease_factor": 2.5,
+                }
+                for index, rating in enumerate(ratings)
+            ]
+        )
+
+    with get_engine().begin() as connection:
+        _backfill_card_states(connection)
+
+    with session_scope() as session:
+        repo = FlashcardRepository(session)
+        state = repo.get_card_states([card.id])[card.id]
+        replayed = service._load_state(repo, card.id, None)
+        assert (state.repetitions, state.lapses) == (replayed.repetitions, replayed.lapses)
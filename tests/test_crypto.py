@@ -0,0 +1,91 @@
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+
+from app.compression import CODEC_NONE, CompressionPolicy
+from app.crypto import ENVELOPE_VERSION, NONCE_BYTES, CryptoContext, is_legacy_token
+
+
+@pytest.fixture
+def context(key):
+    return CryptoContext(key)
+
+
+def test_envelope_round_trip_and_layout(context):
+    blob = context.encrypt(b"secret")
+    assert blob[0] == (CODEC_NONE << 4) | ENVELOPE_VERSION
+    assert len(blob) == 1 + NONCE_BYTES + len(b"secret") + 16
+    assert context.decrypt(blob) == b"secret"
+    assert context.encrypt(b"secret") != blob  # fresh nonce every time
+
+
+def test_compressed_payload_records_its_codec(context):
+    data = b"the same sentence over and over. " * 200
+    blob = context.encrypt(data)
+    assert blob[0] >> 4 != CODEC_NONE
+    assert len(blob) < len(data) // 2
+    assert context.decrypt(blob) == data
+
+
+@pytest.mark.parametrize("position", [0, 1, NONCE_BYTES + 1, -1])
+def test_tampering_is_detected(context, position):
+    blob = bytearray(context.encrypt(b"x" * 2000))
+    blob[position] ^= 0x10
+    with pytest.raises((InvalidTag, ValueError)):
+        context.decrypt(bytes(blob))
+
+
+def test_codec_nibble_is_authenticated(context):
+    blob = bytearray(context.encrypt(b"y" * 4000))
+    blob[0] = (CODEC_NONE << 4) | ENVELOPE_VERSION
+    with pytest.raises(InvalidTag):
+        context.decrypt(bytes(blob))
+
+
+def test_unknown_envelope_version_is_rejected(context):
+    blob = bytearray(context.encrypt(b"data"))
+    blob[0] = (blob[0] & 0xF0) | (ENVELOPE_VERSION + 1)
+    with pytest.raises(ValueError):
+        context.decrypt(bytes(blob))
+
+
+def test_other_key_cannot_open(context):
+    with pytest.raises(InvalidTag):
+        CryptoContext(Fernet.generate_key()).decrypt(context.encrypt(b"data"))
+
+
+def test_legacy_fernet_tokens_still_decrypt(context, key):
+    token = Fernet(key).encrypt(b'{"front": "old"}')
+    assert is_legacy_token(token)
+    assert context.decrypt(token) == b'{"front": "old"}'
+    assert context.decrypt_payload(token) == {"front": "old"}
+
+
+def test_reencrypt_converts_legacy_tokens(key):
+    context = CryptoContext(key, parallel_threshold=4)
+    tokens = [Fernet(key).encrypt(os.urandom(50)) for _ in range(10)]
+    plain = [Fernet(key).decrypt(token) for token in tokens]
+    sealed = context.reencrypt_many(tokens)
+    assert not any(is_legacy_token(blob) for blob in sealed)
+    assert context.decrypt_many(sealed) == plain
+
+
+def test_batches_keep_input_order(key):
+    context = CryptoContext(key, parallel_threshold=8)
+    items = [str(index).encode() * (index % 7 + 1) for index in range(500)]
+    assert context.decrypt_many(context.encrypt_many(items)) == items
+
+
+def test_payload_round_trip_through_cache(context):
+    payload = {"front": "Q", "back": "A", "extra": None}
+    blob = context.encrypt_payload(payload)
+    first = context.decrypt_payload(blob, ("flashcard", 1))
+    first["front"] = "edited"
+    assert context.decrypt_payload(blob, ("flashcard", 1)) == payload
+
+
+def test_policy_stores_incompressible_data_as_is():
+    codec, body = CompressionPolicy(threshold=16).encode(os.urandom(4096))
+    assert codec == CODEC_NONE
@@ -0,0 +1,116 @@
+import io
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from app.attachment_store import AttachmentStore
+from app.crypto import CryptoContext
+from app.crypto_stream import TAG_BYTES
+
+CHUNK = 64
+HEADER_BYTES = 16
+
+
+@pytest.fixture
+def context(key):
+    return CryptoContext(key)
+
+
+def _seal(context, data, chunk_size=CHUNK):
+    target = io.BytesIO()
+    with context.stream_writer(target, chunk_size=chunk_size) as writer:
+        # Odd write sizes so chunk boundaries never line up with writes.
+        for start in range(0, len(data), 37):
+            writer.write(data[start : start + 37])
+    return target.getvalue()
+
+
+def _open(context, sealed):
+    return context.stream_reader(io.BytesIO(sealed))
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 5 * CHUNK, 5 * CHUNK + 3])
+def test_round_trip(context, size):
+    data = os.urandom(size)
+    sealed = _seal(context, data)
+    chunks = max(1, -(-size // CHUNK))
+    assert len(sealed) == HEADER_BYTES + size + chunks * TAG_BYTES
+    with _open(context, sealed) as reader:
+        assert reader.size == size
+        assert reader.read() == data
+
+
+@pytest.mark.parametrize(
+    "offset, length", [(0, 10), (CHUNK - 5, 10), (3 * CHUNK, CHUNK), (200, 1000), (319, 5)]
+)
+def test_seek_reads_any_range(context, offset, length):
+    data = os.urandom(5 * CHUNK)
+    with _open(context, _seal(context, data)) as reader:
+        reader.seek(offset)
+        assert reader.read(length) == data[offset : offset + length]
+        reader.seek(-7, io.SEEK_END)
+        assert reader.read() == data[-7:]
+
+
+def _chunks(sealed):
+    body = sealed[HEADER_BYTES:]
+    stride = CHUNK + TAG_BYTES
+    return sealed[:HEADER_BYTES], [body[i : i + stride] for i in range(0, len(body), stride)]
+
+
+def test_tampered_chunk_fails(context):
+    sealed = bytearray(_seal(context, os.urandom(3 * CHUNK)))
+    sealed[HEADER_BYTES + CHUNK + TAG_BYTES + 5] ^= 1
+    with _open(context, bytes(sealed)) as reader:
+        assert len(reader.read(CHUNK)) == CHUNK  # untouched chunk still reads
+        with pytest.raises(InvalidTag):
+            reader.read(CHUNK)
+
+
+def test_tampered_header_fails(context):
+    sealed = bytearray(_seal(context, b"data"))
+    sealed[10] ^= 1  # inside the nonce prefix
+    with pytest.raises(InvalidTag):
+        _open(context, bytes(sealed)).read()
+
+
+def test_truncation_at_a_chunk_boundary_fails(context):
+    header, chunks = _chunks(_seal(context, os.urandom(3 * CHUNK + 10)))
+    with pytest.raises(InvalidTag):
+        _open(context, header + b"".join(chunks[:-1])).read()
+
+
+def test_reordered_chunks_fail(context):
+    header, chunks = _chunks(_seal(context, os.urandom(3 * CHUNK + 10)))
+    chunks[0], chunks[1] = chunks[1], chunks[0]
+    with pytest.raises(InvalidTag):
+        _open(context, header + b"".join(chunks)).read()
+
+
+@pytest.mark.parametrize("sealed", [b"", b"KSS1", b"not a stream at all"])
+def test_bad_header_is_rejected(context, sealed):
+    with pytest.raises(ValueError):
+        _open(context, sealed)
+
+
+def test_attachment_store_deduplicates_and_streams(key, tmp_path):
+    store = AttachmentStore(key, root=tmp_path)
+    data = os.urandom(200_000)
+    first = store.put(7, io.BytesIO(data))
+    second = store.put(7, io.BytesIO(data))
+    assert first == second and first[1] == len(data)
+    stored = [path for path in (tmp_path / "7").rglob("*") if path.is_file()]
+    assert len(stored) == 1 and data[:64] not in stored[0].read_bytes()
+    with store.open(7, first[0]) as reader:
+        reader.seek(150_000)
+        assert reader.read(100) == data[150_000:150_100]
+
+
+def test_attachment_store_reads_files_stored_as_one_envelope(key, tmp_path):
+    store = AttachmentStore(key, root=tmp_path)
+    path = store.path(7, "ab" * 32)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(CryptoContext(key).encrypt(b"older attachment"))
+    with store.open(7, "ab" * 32) as reader:
+        assert reader.read() == b"older attachment"
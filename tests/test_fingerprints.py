@@ -0,0 +1,27 @@
+import pytest
+
+from app.services.flashcard_service import FlashcardService
+
+
+def test_cards_without_front_or_back_are_not_duplicates(user_id, key):
+    service = FlashcardService(key)
+    cards = [
+        {"prompt": "Explain TCP slow start"},
+        {"prompt": "Explain DNS resolution"},
+        {"extra": "Only an extra field"},
+        {"front": None, "back": "", "prompt": "Explain TCP   slow START"},  # duplicate of the first
+    ]
+    assert service.bulk_import(user_id=user_id, cards=cards) == 3
+    prompts = sorted(card.content["prompt"] or "" for card in service.list_flashcards(user_id))
+    assert prompts == ["", "Explain DNS resolution", "Explain TCP slow start"]
+
+
+def test_front_and_back_still_decide_duplicates(user_id, key):
+    service = FlashcardService(key)
+    create = dict(user_id=user_id, deck_id=None, card_type="basic")
+    service.create_flashcard(**create, content={"front": "Q", "back": "A", "prompt": "one"})
+    with pytest.raises(ValueError):
+        service.create_flashcard(**create, content={"front": " q ", "back": "a", "prompt": "two"})
+    service.create_flashcard(**create, content={"prompt": "one"})
+    service.create_flashcard(**create, content={"prompt": "two"})
+    assert len(service.list_flashcards(user_id)) == 3
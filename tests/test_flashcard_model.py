@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+from app.services.flashcard_service import FlashcardService  # noqa: E402
+from app.ui.flashcard_model import FlashcardListModel  # noqa: E402
+
+CARDS = 95
+
+
+@pytest.fixture
+def model(user_id, key):
+    service = FlashcardService(key)
+    service.bulk_import(
+        user_id=user_id,
+        cards=({"front": f"Card {index}", "back": "back"} for index in range(CARDS)),
+    )
+    model = FlashcardListModel(service, user_id, page_size=10, resident_pages=2)
+    while model.canFetchMore():
+        model.fetchMore()
+    return model
+
+
+def _front(model, row):
+    return model.data(model.index(row))
+
+
+def test_scrolling_keeps_only_resident_pages(model):
+    assert model.rowCount() == CARDS
+    assert len(model._pages) == 2
+    for row in range(CARDS):
+        assert _front(model, row) == f"[basic] Card {row}"
+        assert len(model._pages) <= 2
+
+
+def test_paged_out_rows_are_fetched_again(model):
+    first = model.data(model.index(3), QtCore.Qt.UserRole)
+    _front(model, 50)
+    _front(model, 90)
+    assert 0 not in model._pages
+    again = model.data(model.index(3), QtCore.Qt.UserRole)
+    assert again is not first and again.id == first.id
+    assert _front(model, 3) == "[basic] Card 3"
+
+
+def test_deleted_rows_read_as_empty(model, user_id):
+    from app.database import session_scope
+    from app.models.entities import Flashcard
+
+    deleted = model.data(model.index(12), QtCore.Qt.UserRole).id
+    _front(model, 50)
+    _front(model, 90)
+    with session_scope() as session:
+        session.query(Flashcard).filter_by(id=deleted).delete()
+    assert _front(model, 12) is None
+    assert _front(model, 13) == "[basic] Card 13"
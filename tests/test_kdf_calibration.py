@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from app import security
+from app.config import paths
+from app.security import KdfParams, calibrate_kdf, host_kdf_params
+
+FLOOR = security.security
+
+
+def _machine(monkeypatch, seconds_per_gib_pass):
+    """Pretend a derivation costs ``seconds_per_gib_pass`` per pass over 1 GiB."""
+    runs = []
+
+    def benchmark(params):
+        runs.append(params)
+        return params.time_cost * params.memory_cost / 2**20 * seconds_per_gib_pass
+
+    monkeypatch.setattr(security, "benchmark_kdf", benchmark)
+    return runs
+
+
+def test_memory_doubles_while_a_run_stays_under_half_the_target(monkeypatch):
+    runs = _machine(monkeypatch, seconds_per_gib_pass=3.0)
+    params = calibrate_kdf(target_seconds=0.5)
+    # At 76 MiB the two floor passes take ~0.45 s, so doubling again would overshoot.
+    assert params.memory_cost == FLOOR.kdf_min_memory_cost * 4
+    assert [run.memory_cost for run in runs] == [FLOOR.kdf_min_memory_cost * 2**i for i in range(3)]
+    assert params.time_cost == FLOOR.kdf_min_time_cost
+    assert params.parallelism == FLOOR.password_hash_parallelism
+
+
+def test_memory_never_exceeds_the_cap(monkeypatch):
+    runs = _machine(monkeypatch, seconds_per_gib_pass=0.01)
+    params = calibrate_kdf(target_seconds=0.5)
+    assert max(run.memory_cost for run in runs) <= FLOOR.kdf_max_memory_cost
+    assert params.memory_cost * 2 > FLOOR.kdf_max_memory_cost
+    assert params.time_cost > FLOOR.kdf_min_time_cost  # the rest of the budget goes to passes
+
+
+def test_slow_machines_keep_the_floors(monkeypatch):
+    runs = _machine(monkeypatch, seconds_per_gib_pass=100.0)
+    params = calibrate_kdf(target_seconds=0.5)
+    assert len(runs) == 1
+    assert params == KdfParams(
+        time_cost=FLOOR.kdf_min_time_cost,
+        memory_cost=FLOOR.kdf_min_memory_cost,
+        parallelism=FLOOR.password_hash_parallelism,
+    )
+
+
+@pytest.fixture
+def calibration(monkeypatch, tmp_path):
+    cache = tmp_path / "kdf_calibration.json"
+    monkeypatch.setattr(type(paths), "kdf_calibration", property(lambda self: cache))
+    calls = []
+    result = KdfParams(time_cost=4, memory_cost=65536, parallelism=2)
+
+    def calibrate(target_seconds=None):
+        calls.append(target_seconds)
+        return result
+
+    monkeypatch.setattr(security, "calibrate_kdf", calibrate)
+    host_kdf_params.cache_clear()
+    yield cache, calls, result
+    host_kdf_params.cache_clear()
+
+
+def test_calibration_is_saved_and_reused(calibration):
+    cache, calls, result = calibration
+    assert host_kdf_params() == result
+    assert json.loads(cache.read_text())["params"] == result.to_dict()
+
+    host_kdf_params.cache_clear()
+    assert host_kdf_params() == result
+    assert len(calls) == 1
+
+
+def test_calibration_is_redone_for_another_host(calibration):
+    cache, calls, result = calibration
+    host_kdf_params()
+    saved = json.loads(cache.read_text())
+    saved["host"]["cpus"] = -1
+    saved["params"] = KdfParams(1, 64, 1).to_dict()
+    cache.write_text(json.dumps(saved))
+
+    host_kdf_params.cache_clear()
+    assert host_kdf_params() == result
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("contents", ["not json", "{}", '{"host": 1}', "[]"])
+def test_unreadable_calibration_is_replaced(calibration, contents):
+    cache, calls, result = calibration
+    cache.write_text(contents)
+    assert host_kdf_params() == result
+    assert len(calls) == 1
+    assert json.loads(cache.read_text())["params"] == result.to_dict()
@@ -0,0 +1,135 @@
+import pytest
+from cryptography.fernet import Fernet
+
+from app.database import session_scope
+from app.repositories.user_repository import UserRepository
+from app.security import (
+    KEY_HIERARCHY_PREFIX,
+    KdfParams,
+    create_key_hierarchy,
+    generate_user_keys,
+    open_key_hierarchy,
+    unlock_user_key,
+    wrap_data_key,
+)
+from app.services import auth_service
+from app.services.auth_service import AuthService
+
+# Cheapest Argon2id cost the library accepts; the format is what is under test.
+FAST = KdfParams(time_cost=1, memory_cost=64, parallelism=1)
+SLOWER = KdfParams(time_cost=2, memory_cost=128, parallelism=1)
+
+
+@pytest.fixture
+def host_params(monkeypatch):
+    current = {"params": FAST}
+    monkeypatch.setattr(auth_service, "host_kdf_params", lambda: current["params"])
+    return current
+
+
+def _open(keys, password):
+    return open_key_hierarchy(
+        password, keys.password_hash, keys.salt, keys.encryption_blob, keys.kdf_params
+    )
+
+
+def test_key_hierarchy_round_trip():
+    keys = create_key_hierarchy("correct horse", FAST)
+    assert keys.password_hash.startswith(KEY_HIERARCHY_PREFIX)
+    assert _open(keys, "correct horse") == keys.data_key
+    Fernet(keys.data_key)  # a usable data key
+
+
+def test_wrong_password_or_params_do_not_open():
+    keys = create_key_hierarchy("correct horse", FAST)
+    assert _open(keys, "correct horsE") is None
+    assert (
+        open_key_hierarchy(
+            "correct horse", keys.password_hash, keys.salt, keys.encryption_blob, SLOWER
+        )
+        is None
+    )
+
+
+def test_tampered_wrapped_key_does_not_open():
+    keys = create_key_hierarchy("correct horse", FAST)
+    blob = bytearray(keys.encryption_blob)
+    blob[-5] ^= 1
+    keys.encryption_blob = bytes(blob)
+    assert _open(keys, "correct horse") is None
+
+
+def test_rewrapping_keeps_the_data_key():
+    keys = create_key_hierarchy("correct horse", FAST)
+    rewrapped = wrap_data_key("correct horse", keys.data_key, SLOWER)
+    assert rewrapped.salt != keys.salt
+    assert _open(rewrapped, "correct horse") == keys.data_key
+
+
+def _create_legacy_user(username, password):
+    password_hash, salt, blob = generate_user_keys(password)
+    with session_scope() as session:
+        UserRepository(session).create_user(
+            username=username, password_hash=password_hash, salt=salt, encryption_blob=blob
+        )
+    return unlock_user_key(password, salt, blob)
+
+
+def _stored(username):
+    with session_scope() as session:
+        user = UserRepository(session).get_by_username(username)
+        return user.password_hash, user.kdf_params
+
+
+def test_legacy_login_upgrades_to_key_hierarchy(database, host_params):
+    legacy_key = _create_legacy_user("legacy", "hunter2")
+    service = AuthService()
+
+    assert service.authenticate("legacy", "wrong") is None
+    assert not _stored("legacy")[0].startswith(KEY_HIERARCHY_PREFIX)
+
+    user = service.authenticate("legacy", "hunter2")
+    assert user.encryption_key == legacy_key
+    password_hash, params = _stored("legacy")
+    assert password_hash.startswith(KEY_HIERARCHY_PREFIX)
+    assert params == FAST.to_dict()
+
+    # The upgraded account keeps unlocking the same data key.
+    assert service.authenticate("legacy", "hunter2").encryption_key == legacy_key
+    assert service.authenticate("legacy", "wrong") is None
+
+
+def test_login_rehashes_when_host_cost_changes(database, host_params):
+    service = AuthService()
+    data_key = service.register("rehash", "pw").encryption_key
+    assert _stored("rehash")[1] == FAST.to_dict()
+
+    host_params["params"] = SLOWER
+    assert service.authenticate("rehash", "pw").encryption_key == data_key
+    assert _stored("rehash")[1] == SLOWER.to_dict()
+    assert service.authenticate("rehash", "pw").encryption_key == data_key
+
+
+@pytest.mark.parametrize(
+    "host",
+    [
+        KdfParams(time_cost=1, memory_cost=64, parallelism=1),  # weaker machine
+        KdfParams(time_cost=3, memory_cost=64, parallelism=1),  # more passes, less memory
+    ],
+)
+def test_login_never_lowers_the_stored_cost(database, host_params, host):
+    host_params["params"] = SLOWER
+    service = AuthService()
+    username = f"strong{host.time_cost}"
+    data_key = service.register(username, "pw").encryption_key
+
+    host_params["params"] = host
+    assert service.authenticate(username, "pw").encryption_key == data_key
+    assert _stored(username)[1] == SLOWER.to_dict()
+
+
+def test_stronger_means_no_cost_lower_and_one_higher():
+    assert SLOWER.is_stronger_than(FAST)
+    assert not FAST.is_stronger_than(SLOWER)
+    assert not FAST.is_stronger_than(FAST)
+    assert not KdfParams(3, 64, 1).is_stronger_than(SLOWER)
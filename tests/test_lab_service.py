@@ -0,0 +1,21 @@
+import io
+
+from app.services.lab_service import LabService
+
+
+def test_checklist_summaries_count_tasks_and_attachments(user_id, key):
+    labs = LabService(key)
+    empty = labs.create_checklist(user_id, "empty", "")
+    busy = labs.create_checklist(user_id, "busy", "")
+    for index in range(4):
+        task = labs.add_task(busy, f"t{index}", "Done" if index % 2 else "To-do")
+        for _ in range(index):
+            labs.add_attachment(task, "a.txt", io.BytesIO(b"x"))
+
+    summaries = {summary.id: summary for summary in labs.checklist_summaries(user_id)}
+
+    assert (summaries[empty].task_count, summaries[empty].attachment_count) == (0, 0)
+    assert summaries[empty].status_counts == {}
+    assert summaries[busy].task_count == 4
+    assert summaries[busy].attachment_count == 6
+    assert summaries[busy].status_counts == {"To-do": 2, "Done": 2}
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from app import migrations
+from app.migrations import Migration, get_schema_version, run_migrations
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_failed_migration_rolls_back_its_ddl(engine, monkeypatch):
+    def create_then_fail(connection):
+        connection.exec_driver_sql("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("disk full")
+
+    def create(connection):
+        connection.exec_driver_sql("CREATE TABLE done (id INTEGER)")
+
+    steps = [Migration(1, "ok", create), Migration(2, "fails", create_then_fail)]
+    monkeypatch.setattr(migrations, "MIGRATIONS", steps)
+    with pytest.raises(RuntimeError):
+        run_migrations(engine)
+    tables = inspect(engine).get_table_names()
+    assert "done" in tables
+    assert "half_done" not in tables
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == 1
+
+
+def test_attachment_rebuild_recovers_from_leftover_copy(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE attachments (id INTEGER PRIMARY KEY, task_id INTEGER NOT NULL, "
+            "filename VARCHAR(255) NOT NULL, blob BLOB NOT NULL, created_at DATETIME)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO attachments (id, task_id, filename, blob) VALUES (1, 1, 'a.txt', x'0102')"
+        )
+        connection.exec_driver_sql("CREATE TABLE attachments_new (id INTEGER)")
+        connection.exec_driver_sql("PRAGMA user_version = 4")
+
+    assert run_migrations(engine) == migrations.LATEST_VERSION
+
+    with engine.connect() as connection:
+        row = connection.exec_driver_sql(
+            "SELECT filename, blob, size, content_hash FROM attachments"
+        ).one()
+    assert tuple(row) == ("a.txt", b"\x01\x02", 2, None)
+    assert "attachments_new" not in inspect(engine).get_table_names()
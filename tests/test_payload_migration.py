@@ -0,0 +1,56 @@
+from cryptography.fernet import Fernet
+from sqlalchemy import select, update
+
+from app.crypto import CryptoContext, is_legacy_token
+from app.database import session_scope
+from app.models.entities import Flashcard
+from app.services.payload_migration_service import PayloadMigrationService
+
+
+def _legacy_cards(user_id, key, count):
+    fernet = Fernet(key)
+    with session_scope() as session:
+        cards = [
+            Flashcard(
+                user_id=user_id,
+                card_type="basic",
+                data=fernet.encrypt(f'{{"front": "card {index}"}}'.encode()),
+            )
+            for index in range(count)
+        ]
+        session.add_all(cards)
+        session.flush()
+        return [card.id for card in cards]
+
+
+def _blobs(ids):
+    with session_scope() as session:
+        rows = session.execute(select(Flashcard.id, Flashcard.data).where(Flashcard.id.in_(ids)))
+        return dict(rows.all())
+
+
+def test_migrates_every_legacy_row(database, user_id, key):
+    ids = _legacy_cards(user_id, key, 7)
+    assert PayloadMigrationService(key).migrate(user_id, batch_size=3) == 7
+    blobs = _blobs(ids)
+    assert not any(is_legacy_token(blob) for blob in blobs.values())
+    assert CryptoContext(key).decrypt(blobs[ids[2]]) == b'{"front": "card 2"}'
+
+
+def test_save_during_migration_is_not_overwritten(database, user_id, key, monkeypatch):
+    ids = _legacy_cards(user_id, key, 3)
+    service = PayloadMigrationService(key)
+    newer = CryptoContext(key).encrypt(b'{"front": "edited"}')
+    reencrypt = service._crypto.reencrypt_many
+
+    def save_then_reencrypt(blobs):
+        # A normal save commits between the page read and the rewrite.
+        with session_scope() as session:
+            session.execute(update(Flashcard).where(Flashcard.id == ids[1]).values(data=newer))
+        return reencrypt(blobs)
+
+    monkeypatch.setattr(service._crypto, "reencrypt_many", save_then_reencrypt)
+    assert service.migrate(user_id) == 2
+    blobs = _blobs(ids)
+    assert blobs[ids[1]] == newer
+    assert not is_legacy_token(blobs[ids[0]]) and not is_legacy_token(blobs[ids[2]])
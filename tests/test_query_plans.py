@@ -0,0 +1,139 @@
+"""Every repository read must be answered through an index, never a full table scan."""
+import contextlib
+import datetime as dt
+import io
+
+import pytest
+from sqlalchemy import event
+
+from app.database import get_engine, session_scope
+from app.models.entities import Flashcard
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.content_pack_repository import ContentPackRepository
+from app.repositories.flashcard_repository import FlashcardRepository
+from app.repositories.lab_repository import LabRepository
+from app.repositories.payload_repository import PayloadRepository
+from app.repositories.quiz_repository import QuizRepository
+from app.repositories.search_repository import SearchRepository
+from app.repositories.user_repository import UserRepository
+from app.services.flashcard_service import FlashcardService
+from app.services.lab_service import LabService
+from app.services.payload_migration_service import ENCRYPTED_COLUMNS
+from app.services.quiz_service import QuizService
+
+NOW = dt.datetime(2024, 1, 1)
+
+
+@contextlib.contextmanager
+def captured_selects():
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def full_scans(statement, parameters):
+    """Plan steps that read a whole table or index rather than seeking into one."""
+    with get_engine().connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [
+        row[-1]
+        for row in plan
+        if row[-1].startswith("SCAN ") and row[-1] != "SCAN CONSTANT ROW"
+    ]
+
+
+QUERIES = {
+    "decks": lambda s, u: FlashcardRepository(s).get_deck_rows(u),
+    "deck": lambda s, u: FlashcardRepository(s).get_deck(u, 1),
+    "flashcard rows": lambda s, u: FlashcardRepository(s).get_flashcard_rows(u),
+    "flashcard page": lambda s, u: FlashcardRepository(s).get_flashcard_page(u, after_id=1),
+    "flashcard page by deck": lambda s, u: FlashcardRepository(s).get_flashcard_page(
+        u, deck_id=1, card_type="basic"
+    ),
+    "flashcards by id": lambda s, u: FlashcardRepository(s).get_flashcards_by_ids(u, [1, 2]),
+    "flashcard ids": lambda s, u: FlashcardRepository(s).get_flashcard_ids(u, [1, 2]),
+    "fingerprints": lambda s, u: FlashcardRepository(s).existing_fingerprints(u, ["a", "b"]),
+    "unfingerprinted": lambda s, u: FlashcardRepository(s).get_unfingerprinted_page(u, after_id=1),
+    "due cards": lambda s, u: FlashcardRepository(s).get_due_flashcards(u, NOW, 10),
+    "review logs": lambda s, u: FlashcardRepository(s).get_review_logs(1),
+    "card states": lambda s, u: FlashcardRepository(s).get_card_states([1, 2]),
+    "questions": lambda s, u: QuizRepository(s).list_question_rows(u),
+    "study days": lambda s, u: AnalyticsRepository(s).get_study_days(u),
+    "recent attempts": lambda s, u: AnalyticsRepository(s).get_recent_quiz_attempts(u),
+    "average score": lambda s, u: AnalyticsRepository(s).average_score(u),
+    "packs": lambda s, u: ContentPackRepository(s).list_pack_rows(u),
+    "pack": lambda s, u: ContentPackRepository(s).get_pack(u, 1),
+    "checklists": lambda s, u: LabRepository(s).list_checklists(u, with_notes=True),
+    "checklist summaries": lambda s, u: LabRepository(s).checklist_status_counts(u),
+    "task": lambda s, u: LabRepository(s).get_task(1),
+    "attachment": lambda s, u: LabRepository(s).get_attachment(1),
+    "attachments by hash": lambda s, u: LabRepository(s).count_attachments_with_hash(u, "h"),
+    "search": lambda s, u: SearchRepository(s).match(u, [b"x" * 16, b"y" * 16], entity="flashcard"),
+    "unindexed cards": lambda s, u: SearchRepository(s).get_unindexed_page(
+        Flashcard, "flashcard", u, column="data", after_id=1
+    ),
+    "user": lambda s, u: UserRepository(s).get_by_username("nobody"),
+}
+for spec in ENCRYPTED_COLUMNS:
+    QUERIES[f"legacy {spec.table.name}.{spec.column}"] = (
+        lambda s, u, spec=spec: PayloadRepository(s).get_legacy_page(
+            spec.table, spec.column, spec.owner(u), after_id=1
+        )
+    )
+
+
+@pytest.fixture(scope="module")
+def populated(database):
+    # Relationships need a row to follow, or their eager loaders never query.
+    from cryptography.fernet import Fernet
+
+    from app.models.entities import User
+
+    key = Fernet.generate_key()
+    with session_scope() as session:
+        user = User(username="planner", password_hash="x", password_salt=b"s", encryption_blob=b"b")
+        session.add(user)
+        session.flush()
+        user_id = user.id
+    FlashcardService(key).create_flashcard(
+        user_id=user_id, deck_id=None, card_type="basic", content={"front": "plan", "back": "b"}
+    )
+    quiz = QuizService(key)
+    question = quiz.add_question(
+        user_id=user_id,
+        blueprint_section_id=None,
+        question_type="short",
+        prompt={"text": "p"},
+        answer={"value": "a"},
+        explanation={},
+        references=[],
+        metadata={},
+    )
+    quiz.grade_attempt(
+        user_id=user_id,
+        blueprint_id=None,
+        mode="practice",
+        responses=[{"question_id": question, "answer": "a", "user_answer": "a"}],
+    )
+    labs = LabService(key)
+    task = labs.add_task(labs.create_checklist(user_id, "lab", ""), "task")
+    labs.add_attachment(task, "a.txt", io.BytesIO(b"data"))
+    return user_id
+
+
+@pytest.mark.parametrize("name", sorted(QUERIES))
+def test_query_uses_indexes(populated, name):
+    with session_scope() as session, captured_selects() as statements:
+        QUERIES[name](session, populated)
+    assert statements
+    for statement, parameters in statements:
+        assert not full_scans(statement, parameters), statement
@@ -0,0 +1,74 @@
+from sqlalchemy import event
+
+from app.database import get_engine, session_scope
+from app.repositories.search_repository import SearchRepository
+from app.services.flashcard_service import FlashcardService
+
+
+def _add(service, user_id, front):
+    return service.create_flashcard(
+        user_id=user_id, deck_id=None, card_type="basic", content={"front": front, "back": "b"}
+    ).id
+
+
+def test_search_matches_words_and_prefixes_of_own_cards(database, key):
+    from app.models.entities import User
+
+    with session_scope() as session:
+        users = [
+            User(
+                username=f"searcher{index}",
+                password_hash="x",
+                password_salt=b"s",
+                encryption_blob=b"b",
+            )
+            for index in range(2)
+        ]
+        session.add_all(users)
+        session.flush()
+        mine, theirs = (user.id for user in users)
+    service = FlashcardService(key)
+    firewall = _add(service, mine, "Stateful firewall rules")
+    _add(service, mine, "Stateless packet filter")
+    _add(service, theirs, "Stateful firewall rules too")
+
+    assert [card.id for card in service.search_flashcards(mine, "firewall")] == [firewall]
+    assert [card.id for card in service.search_flashcards(mine, "stateful rules")] == [firewall]
+    assert len(service.search_flashcards(mine, "state*")) == 2
+    assert service.search_flashcards(mine, "firewall packet") == []
+
+
+def test_match_uses_the_primary_key(user_id):
+    plans = []
+
+    def explain(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT"):
+            plan = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.extend(row[-1] for row in plan)
+
+    event.listen(get_engine(), "before_cursor_execute", explain)
+    try:
+        with session_scope() as session:
+            SearchRepository(session).match(user_id, [b"a" * 16, b"b" * 16], entity="flashcard")
+    finally:
+        event.remove(get_engine(), "before_cursor_execute", explain)
+    assert any("USING PRIMARY KEY (user_id=? AND token_hash=?)" in plan for plan in plans), plans
+
+
+def test_cards_without_words_are_indexed_once(user_id, key):
+    from app.crypto import get_crypto_context
+    from app.models.entities import Flashcard
+    from app.services.search_service import SearchService
+
+    crypto = get_crypto_context(key)
+    with session_scope() as session:
+        # Saved before search existed, and too short to yield any token.
+        session.add_all(
+            Flashcard(user_id=user_id, card_type="basic", data=crypto.encrypt_payload(content))
+            for content in ({"front": "x", "back": "y"}, {})
+        )
+    _add(FlashcardService(key), user_id, "z")
+    search = SearchService(key)
+    assert search.index_missing(user_id) == 2
+    assert search.index_missing(user_id) == 0
+    assert search.search(user_id, "x") == []
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from app import serialization
+from app.serialization import SCHEMAS, dumps, loads
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"front": "Capital of France?", "back": "Paris"},
+        {"front": "Q", "back": "A", "extra": "", "prompt": "p", "created": "2024-01-01"},
+        {"front": "ünïcødé ✓", "back": None},
+        {"text": "x" * 0xFFFF},
+        {"notes": ""},
+        {"value": None},
+    ],
+)
+def test_schema_payloads_round_trip_as_binary(payload):
+    data = dumps(payload)
+    assert data[0] == serialization.BINARY_MARKER
+    assert loads(data) == payload
+
+
+def test_binary_record_is_smaller_than_json():
+    payload = {"front": "Q", "back": "A", "extra": None}
+    assert len(dumps(payload)) < len(json.dumps(payload))
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"front": "Q", "tags": ["a"]},  # key outside every schema
+        {"front": 1, "back": "A"},  # non-string value
+        {"text": "x" * (0xFFFF + 1)},  # too long for a uint16 length
+        {},
+        ["front", "back"],
+        "plain",
+        None,
+    ],
+)
+def test_other_payloads_fall_back_to_json(payload):
+    data = dumps(payload)
+    assert data == json.dumps(payload).encode("utf-8")
+    assert loads(data) == payload
+
+
+def test_json_written_before_the_codec_still_loads():
+    legacy = b'{"front": "old", "back": "card", "extra": null}'
+    assert loads(legacy) == {"front": "old", "back": "card", "extra": None}
+
+
+def test_unknown_schema_is_rejected():
+    data = bytearray(dumps({"text": "t"}))
+    data[1] = max(SCHEMAS) + 1
+    with pytest.raises(ValueError):
+        loads(bytes(data))